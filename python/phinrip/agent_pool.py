@@ -0,0 +1,140 @@
+"""
+Several MIDI output ports driven from one clock input
+"""
+import mido
+
+from .midi_queue import MidiAgent
+from .midi_sender import MidiSender
+
+
+class PortAgent:
+    """
+    Agent for one destination of a MidiAgentPool.  Sends go to that
+    port's MidiSender; listening and timestamps come from the pool.
+    """
+
+    def __init__(self, pool, dest, sender):
+        self._pool = pool
+        self.dest = dest
+        self.sender = sender
+        self.metrics = None
+
+    def send(self, midimsg):
+        self.sender.put(bytes(midimsg.bytes()))
+
+    def send_raw(self, data):
+        self.sender.put(data)
+
+    def send_raw_many(self, batch):
+        self.sender.put_many(batch)
+
+    def blocking_listen(self):
+        return self._pool.blocking_listen()
+
+    def now_ns(self):
+        return self._pool.now_ns()
+
+
+class MidiAgentPool(MidiAgent):
+    """
+    One clock input and any number of named output ports.  ``outputs``
+    maps a destination name to a port name.  Each port gets its own
+    MidiSender thread, so a slow device only backs up its own queue;
+    ``sender_args`` are passed to every MidiSender.
+    """
+
+    def __init__(self, outputs=None, in_str=None, metrics=None, **sender_args):
+        super().__init__(None, in_str, metrics)
+        self._outputs = dict(outputs or {})
+        self._sender_args = sender_args
+        self._agents = {}
+
+    def open_ports(self, out_str=None, in_str=None):
+        super().open_ports(None, in_str)
+        for dest, port_name in self._outputs.items():
+            if dest not in self._agents:
+                self._open_output(dest, port_name)
+
+    def add_output(self, dest, port_name):
+        """Open another output port while running."""
+        self._outputs[dest] = port_name
+        return self._open_output(dest, port_name)
+
+    def _open_output(self, dest, port_name):
+        port = mido.open_output(port_name)
+        sender = MidiSender(self._find_raw_writer(port), **self._sender_args)
+        agent = self._agents[dest] = PortAgent(self, dest, sender)
+        return agent
+
+    def agent_for(self, dest):
+        """The agent to hand to a ClipController for ``dest``."""
+        return self._agents[dest]
+
+    def destinations(self):
+        return list(self._agents)
+
+    def stats(self):
+        return {dest: agent.sender.stats() for dest, agent in self._agents.items()}
+
+    def send(self, midimsg):
+        """Send to every output."""
+        data = bytes(midimsg.bytes())
+        for agent in self._agents.values():
+            agent.sender.put(data)
+
+    def close(self):
+        for agent in self._agents.values():
+            agent.sender.close()
+
+
+class SyncFanout:
+    """
+    Listen to one clock source and drive several ExternalSyncQueues.
+    Each message is timestamped once and handed to every attached
+    queue that is still running through ExternalSyncQueue.process(),
+    so tick metrics work as in run(); run() returns when all of them
+    have stopped or the source ends (None).
+
+    When every running queue has ``catch_up`` and the source has
+    pending(), the backlog behind each message is drained once and
+    given to all of them.
+    """
+
+    def __init__(self, agent):
+        self._agent = agent
+        self._clock = agent.now_ns
+        self._pending = getattr(agent, 'pending', None)
+        self._queues = []
+
+    def attach(self, sync_queue):
+        self._queues.append(sync_queue)
+
+    def detach(self, sync_queue):
+        self._queues.remove(sync_queue)
+
+    def run(self):
+        live = [q for q in self._queues if not q.is_stopped()]
+        while live:
+            msg = self._agent.blocking_listen()
+            if msg is None:
+                break
+            now = self._clock()
+            backlog = ()
+            if self._pending is not None and all(q.catch_up for q in live):
+                backlog = list(self._pending())
+            for sync_queue in live:
+                sync_queue.process(msg, now, backlog)
+            if any(q.is_stopped() for q in live):
+                live = [q for q in live if not q.is_stopped()]
+
+    def run_controllers(self, controllers, n):
+        """ClipController.runFor(n) for several controllers on one clock."""
+        for controller in controllers:
+            controller.start(n)
+            self.attach(controller.sync_queue())
+        try:
+            self.run()
+        finally:
+            for controller in controllers:
+                controller.finish()
+                self.detach(controller.sync_queue())
@@ -0,0 +1,111 @@
+"""
+asyncio variants of MidiAgent and ExternalSyncQueue
+"""
+
+import asyncio
+
+import mido
+
+from .midi_queue import MidiAgent, ExternalSyncQueue
+
+
+class AsyncMidiAgent(MidiAgent):
+    """
+    MidiAgent whose input is delivered to asyncio queues.
+
+    mido calls the input callback on its own thread; each message is
+    timestamped there, handed to the event loop with a single
+    call_soon_threadsafe and copied into every subscriber queue as a
+    (message, timestamp ns) pair, so any number of queues can follow
+    one clock on one loop and all see the same arrival time.
+    """
+
+    def __init__(self, out_str=None, in_str=None, loop=None):
+        super().__init__(out_str, in_str)
+        self._loop = loop
+        self._subscribers = []
+        self.dropped = 0
+
+    def open_ports(self, out_str=None, in_str=None):
+        if out_str:
+            self._out_str = out_str
+        if in_str:
+            self._in_str = in_str
+        if self._out_str:
+            self.out_port = mido.open_output(self._out_str)
+            self._raw_writer = self._find_raw_writer(self.out_port)
+        if self._in_str:
+            self.in_port = mido.open_input(self._in_str, callback=self.deliver)
+
+    def subscribe(self, maxsize=0):
+        """Return a new asyncio.Queue that receives every input message."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue(maxsize)
+        self._subscribers.append(inbox)
+        return inbox
+
+    def unsubscribe(self, inbox):
+        if inbox in self._subscribers:
+            self._subscribers.remove(inbox)
+
+    def wake(self, inbox):
+        """
+        Put the None sentinel in ``inbox`` so a subscriber awaiting it
+        returns without new input; safe to call from any thread.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(inbox.put_nowait, None)
+
+    def deliver(self, msg):
+        """Hand a message to the subscribers; safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._dispatch, (msg, self.now_ns()))
+
+    def _dispatch(self, item):
+        for inbox in self._subscribers:
+            try:
+                inbox.put_nowait(item)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+
+def _drain(inbox):
+    while True:
+        try:
+            item = inbox.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        if item is None:
+            return
+        yield item[0]
+
+
+class AsyncExternalSyncQueue(ExternalSyncQueue):
+    """
+    ExternalSyncQueue whose run() is a coroutine awaiting clock
+    messages from an AsyncMidiAgent subscription.  With ``catch_up``
+    the messages already waiting in the subscription are drained after
+    each one.  stop() wakes run() through the subscription, so it
+    returns even when no more input arrives.
+    """
+
+    _inbox = None
+
+    async def run(self):
+        inbox = self._inbox = self._agent.subscribe()
+        try:
+            while self._keep_running:
+                item = await inbox.get()
+                if item is None:
+                    break
+                msg, timestamp_ns = item
+                self.process(msg, timestamp_ns, _drain(inbox))
+        finally:
+            self._inbox = None
+            self._agent.unsubscribe(inbox)
+
+    def stop(self):
+        super().stop()
+        if self._inbox is not None:
+            self._agent.wake(self._inbox)
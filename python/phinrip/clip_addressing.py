@@ -0,0 +1,117 @@
+"""
+Addressing schemes that map clip launcher (track, scene) slots to MIDI
+"""
+
+SCENE_COUNT = 8
+TRACK_COUNT = 8
+
+# Velocity mido gives a note_on when none is passed
+LAUNCH_VELOCITY = 64
+
+
+class ClipAddressing:
+    """
+    Precomputed table of encoded launch messages for a grid of
+    ``track_count`` x ``scene_count`` clips.  Subclasses provide
+    _encode(); lookups and scene rows are plain indexing.
+    """
+
+    def __init__(self, track_count=TRACK_COUNT, scene_count=SCENE_COUNT):
+        self.track_count = track_count
+        self.scene_count = scene_count
+
+    def _build(self):
+        self._table = tuple(
+            tuple(self._encode(t, s) for s in range(self.scene_count))
+            for t in range(self.track_count))
+        self._rows = tuple(
+            tuple(self._table[t][s] for t in range(self.track_count))
+            for s in range(self.scene_count))
+
+    def _encode(self, track, scene):
+        raise NotImplementedError
+
+    def launch_bytes(self, track, scene):
+        if not (0 <= track < self.track_count and 0 <= scene < self.scene_count):
+            raise ValueError(f"Clip [Track {track}:Scene {scene}] outside "
+                             f"{self.track_count}x{self.scene_count} grid.")
+        return self._table[track][scene]
+
+    def scene_row(self, scene):
+        """Launch messages for every track in ``scene``."""
+        return self._rows[scene]
+
+
+class NoteAddressing(ClipAddressing):
+    """
+    One note_on per clip at ``base_note + track*scene_count + scene``.
+    Once the notes run out the numbering continues from ``base_note``
+    on the next channel.  The defaults match the original 8x8 layout.
+    """
+
+    def __init__(self, track_count=TRACK_COUNT, scene_count=SCENE_COUNT,
+                 base_note=10, channel=0, velocity=LAUNCH_VELOCITY):
+        super().__init__(track_count, scene_count)
+        self.base_note = base_note
+        self.channel = channel
+        self.velocity = velocity
+        self._bank_size = 128 - base_note
+        self._build()
+
+    def _encode(self, track, scene):
+        channel, offset = divmod(track * self.scene_count + scene, self._bank_size)
+        channel += self.channel
+        if channel > 15:
+            raise ValueError(f"{self.track_count}x{self.scene_count} clips do not fit "
+                             f"in note banks from channel {self.channel}.")
+        return bytes((0x90 | channel, self.base_note + offset, self.velocity))
+
+
+class TrackChannelAddressing(ClipAddressing):
+    """
+    Tracks are spread over the 16 channels (track % 16); each further
+    group of 16 tracks takes the next ``scene_count`` notes.
+    """
+
+    def __init__(self, track_count=TRACK_COUNT, scene_count=SCENE_COUNT,
+                 base_note=0, velocity=LAUNCH_VELOCITY):
+        super().__init__(track_count, scene_count)
+        self.base_note = base_note
+        self.velocity = velocity
+        self._build()
+
+    def _encode(self, track, scene):
+        bank, channel = divmod(track, 16)
+        note = self.base_note + bank * self.scene_count + scene
+        if note > 127:
+            raise ValueError(f"{self.track_count}x{self.scene_count} clips do not fit "
+                             "in one note range per channel.")
+        return bytes((0x90 | channel, note, self.velocity))
+
+
+class CCAddressing(ClipAddressing):
+    """
+    One control_change per clip, numbered from ``base_cc`` in pages of
+    controllers below 120 (the channel mode messages), one page per
+    channel.
+    """
+
+    def __init__(self, track_count=TRACK_COUNT, scene_count=SCENE_COUNT,
+                 base_cc=0, channel=0, value=127):
+        super().__init__(track_count, scene_count)
+        self.base_cc = base_cc
+        self.channel = channel
+        self.value = value
+        self._page_size = 120 - base_cc
+        self._build()
+
+    def _encode(self, track, scene):
+        page, offset = divmod(track * self.scene_count + scene, self._page_size)
+        channel = self.channel + page
+        if channel > 15:
+            raise ValueError(f"{self.track_count}x{self.scene_count} clips do not fit "
+                             f"in CC pages from channel {self.channel}.")
+        return bytes((0xB0 | channel, self.base_cc + offset, self.value))
+
+
+DEFAULT_ADDRESSING = NoteAddressing()
@@ -1,30 +1,38 @@
 
 
 from .midi_queue import MidiAgent, ExternalSyncQueue
-from .event import Event
+from .event import Event, DiscreteEventQueue
+from .clip_addressing import SCENE_COUNT, TRACK_COUNT, DEFAULT_ADDRESSING
+from .timeline import LaunchTimeline
 import mido
 
+import queue
 import random
-
-SCENE_COUNT = 8
-TRACK_COUNT = 8
+import threading
 
 class Clip:
     def __init__(self, track_nbr, scene_nbr):
         self.track_nbr = track_nbr
         self.scene_nbr = scene_nbr
 
-    def _convertToNoteVal(self):
-        return ((self.track_nbr*SCENE_COUNT)+self.scene_nbr)+10
+    def _convertToNoteVal(self, addressing=DEFAULT_ADDRESSING):
+        """Note (first data byte) of the launch message."""
+        return self.midi_bytes(addressing)[1]
+
+    def constructMidiMessage(self, addressing=DEFAULT_ADDRESSING):
+        return mido.Message.from_bytes(self.midi_bytes(addressing))
 
-    def constructMidiMessage(self):
-        msg = mido.Message('note_on', note=self._convertToNoteVal())
-        return msg
+    def midi_bytes(self, addressing=DEFAULT_ADDRESSING):
+        """Encoded launch message from the addressing table."""
+        return addressing.launch_bytes(self.track_nbr, self.scene_nbr)
 
     def __str__(self):
         return f"[Track {self.track_nbr}:Scene {self.scene_nbr}]"
 
 class UpdateEvent(Event):
+    # Drives generation; never dropped by a catch-up
+    may_drop = False
+
     def __init__(self, parent, firetime):
         super().__init__(firetime)
         self._parent = parent
@@ -46,9 +54,34 @@ class LaunchClipEvent(Event):
     def _fire_event(self):
         self._parent.sendClip(self._clip)
 
+    def payload_ids(self):
+        return (self._clip.track_nbr, self._clip.scene_nbr)
+
+    def collapse_key(self):
+        # A later launch on the same track replaces the clip anyway
+        return (LaunchClipEvent, self._clip.track_nbr)
+
     def __repr__(self):
         return f"{self.time_str()} Launched {self._clip} at {self.firetime()}"
 
+class LaunchSceneEvent(Event):
+    def __init__(self, parent, scene_nbr, firetime):
+        super().__init__(firetime)
+        self._parent = parent
+        self._scene_nbr = scene_nbr
+
+    def _fire_event(self):
+        self._parent.launchScene(self._scene_nbr)
+
+    def payload_ids(self):
+        return (self._scene_nbr,)
+
+    def collapse_key(self):
+        return LaunchSceneEvent
+
+    def __repr__(self):
+        return f"{self.time_str()} Launched scene {self._scene_nbr} at {self.firetime()}"
+
 
 
 class RandomClipGenerator:
@@ -66,37 +99,243 @@ class RandomClipGenerator:
                                        self._delta+firetime)
         return [launch_event]
         
+class TimelineClipGenerator:
+    """
+    Replay a LaunchTimeline rendered by ClipController.renderOffline().
+    Each update schedules the launches that fall before the next
+    update, so nothing is generated on the tick path.
+    """
+    def __init__(self, timeline):
+        self._timeline = timeline
+
+    def generate(self, firetime, controller):
+        timeline = self._timeline
+        lo, hi = timeline.window(firetime, firetime + controller.update_interval)
+        return [LaunchClipEvent(controller,
+                                Clip(timeline.tracks[i], timeline.scenes[i]),
+                                timeline.ticks[i])
+                for i in range(lo, hi)]
+
+class LookaheadGenerator:
+    """
+    Wrap a clip generator so it runs on a background thread, ``depth``
+    updates ahead of the clock.  generate() only pops events that are
+    already computed.
+
+    When the worker falls behind, the update is counted in
+    ``deadline_misses``.  With on_miss='wait' the tick waits for the
+    late events; with 'skip' the update gets no events and the late
+    result is discarded when it arrives.
+
+    If the wrapped generator raises, the worker stops and generate()
+    re-raises the exception once the events computed before it have
+    been used up.
+    """
+
+    def __init__(self, clip_event_gen, depth=4, on_miss='wait'):
+        if on_miss not in ('wait', 'skip'):
+            raise ValueError(f"Unknown on_miss policy '{on_miss}'.")
+        self._event_gen = clip_event_gen
+        self._buffer = queue.Queue(maxsize=depth)
+        self._on_miss = on_miss
+        self._halt = threading.Event()
+        self._thread = None
+        self._error = None
+        self.depth = depth
+        self.deadline_misses = 0
+        self.skipped = 0
+
+    def start(self, firetime, interval, controller):
+        """Start generating from ``firetime`` and wait for the buffer to fill."""
+        self._thread = threading.Thread(target=self._produce,
+                                        args=(firetime, interval, controller),
+                                        name="clip-lookahead", daemon=True)
+        self._thread.start()
+        while not self._buffer.full() and self._thread.is_alive():
+            self._halt.wait(0.001)
+
+    def _produce(self, firetime, interval, controller):
+        while not self._halt.is_set():
+            try:
+                item = (firetime, list(self._event_gen.generate(firetime, controller)))
+            except Exception as exc:
+                self._error = exc
+                return
+            while not self._halt.is_set():
+                try:
+                    self._buffer.put(item, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+            firetime += interval
+
+    def stop(self):
+        self._halt.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def buffered(self):
+        return self._buffer.qsize()
+
+    def generate(self, firetime, controller):
+        try:
+            item = self._buffer.get_nowait()
+        except queue.Empty:
+            self._check_worker()
+            self.deadline_misses += 1
+            if self._on_miss == 'skip':
+                self.skipped += 1
+                return []
+            item = self._get()
+        # Results for updates that were skipped arrive late; drop them
+        while item[0] < firetime:
+            item = self._get()
+        return item[1]
+
+    def _get(self):
+        while True:
+            try:
+                return self._buffer.get(timeout=0.05)
+            except queue.Empty:
+                self._check_worker()
+
+    def _check_worker(self):
+        """Raise if the worker has stopped and nothing more will arrive."""
+        if self._error is not None:
+            raise self._error
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("Lookahead worker is not running.")
+
+
 class ClipController:
     """
     Control Bitwig-based clip launcher to 
     play a song
     """
 
-    def __init__(self, clip_event_gen, agent_cls=MidiAgent):
-        self._agent = agent_cls()
-        self._queue = ExternalSyncQueue(self._agent)
+    def __init__(self, clip_event_gen, agent_cls=MidiAgent,
+                 queue_cls=DiscreteEventQueue, sync_cls=ExternalSyncQueue,
+                 agent=None, lookahead=0, metrics=None, addressing=None,
+                 **sync_args):
+        # Pass ``agent`` to share one agent between controllers
+        self._agent = agent if agent is not None else agent_cls()
+        # Maps (track, scene) to launch messages; see clip_addressing.py
+        self._addressing = addressing or DEFAULT_ADDRESSING
+        if metrics is not None:
+            self._agent.metrics = metrics
+        # sync_args (catch_up, stale_policy, ...) go to sync_cls
+        self._queue = sync_cls(self._agent, queue_cls, metrics=metrics, **sync_args)
         # default 24 ticks per quarter note
         self.update_interval = 24*4
+        # With lookahead, generate that many updates ahead on a worker thread
+        self._lookahead = None
+        if lookahead:
+            self._lookahead = LookaheadGenerator(clip_event_gen, lookahead)
+            clip_event_gen = self._lookahead
         self._event_gen = clip_event_gen
         self.update_count = 0
+        self._timeline = None
+        self._started = False
 
     def generateNewEvents(self, firetime):
         # Add another update item
         self._queue.add(UpdateEvent(self, firetime+self.update_interval))
         self.update_count += 1
-        for event in self._event_gen.generate(firetime, self):
-            self._queue.add(event)
+        self._queue.add_many(self._event_gen.generate(firetime, self))
         if self._end_check(self):
             self._queue.stop()
 
     def sendClip(self, clip):
-        self._agent.send(clip.constructMidiMessage())
+        if self._timeline is not None:
+            self._timeline.append(self._queue.current_time(),
+                                  clip.track_nbr, clip.scene_nbr)
+            return
+        # Agents with a raw path skip building a mido.Message per launch
+        send_raw = getattr(self._agent, 'send_raw', None)
+        if send_raw is not None:
+            send_raw(clip.midi_bytes(self._addressing))
+        else:
+            self._agent.send(clip.constructMidiMessage(self._addressing))
 
-    def runFor(self, n):
+    def launchScene(self, scene_nbr):
+        """Launch every track's clip in a scene as one batch."""
+        if self._timeline is not None:
+            now = self._queue.current_time()
+            for track_nbr in range(self._addressing.track_count):
+                self._timeline.append(now, track_nbr, scene_nbr)
+            return
+        row = self._addressing.scene_row(scene_nbr)
+        send_raw_many = getattr(self._agent, 'send_raw_many', None)
+        if send_raw_many is not None:
+            send_raw_many(row)
+        else:
+            for data in row:
+                self._agent.send(mido.Message.from_bytes(data))
+
+    def start(self, n):
+        """
+        Schedule the first update and start the lookahead worker for a
+        run of n updates, for callers that drive sync_queue() themselves
+        (see SyncFanout).  Pair with finish().
+        """
+        # The queue's clock, schedule and stop flag all carry over from
+        # a previous run, so each controller runs once
+        if self._started:
+            raise RuntimeError("ClipController has already run; create a new one.")
+        self._started = True
+        # n is the number of updates
         self._end_check = lambda x: x.update_count > n
+        if self._lookahead:
+            self._lookahead.start(1, self.update_interval, self)
         self._queue.add(UpdateEvent(self, 1))
-        self._queue.run()
-        # n is the number of updates
+
+    def finish(self):
+        """Stop the lookahead worker after a run started with start()."""
+        if self._lookahead:
+            self._lookahead.stop()
+
+    def runFor(self, n):
+        self.start(n)
+        try:
+            self._queue.run()
+        finally:
+            self.finish()
+
+    async def runForAsync(self, n):
+        """runFor() on an AsyncExternalSyncQueue (sync_cls)."""
+        self.start(n)
+        try:
+            await self._queue.run()
+        finally:
+            self.finish()
+
+    def renderOffline(self, n):
+        """
+        Run n updates against a virtual clock as fast as the CPU allows
+        and return the launches as a LaunchTimeline instead of sending
+        them.  Replay it live with TimelineClipGenerator.
+        """
+        self._timeline = LaunchTimeline()
+        self.start(n)
+        try:
+            self._queue.run_until(None)
+        finally:
+            self.finish()
+            timeline, self._timeline = self._timeline, None
+        return timeline
+
+    def sync_queue(self):
+        """The ExternalSyncQueue (sync_cls) driving this controller."""
+        return self._queue
+
+    def deadline_misses(self):
+        """Updates whose lookahead events were not ready in time."""
+        return self._lookahead.deadline_misses if self._lookahead else 0
+
+    def late_clocks(self):
+        """Clock ticks that piled up and were coalesced by catch-up."""
+        return self._queue.deadline_misses
 
     def event_log(self):
         return self._queue.event_log()
@@ -0,0 +1,173 @@
+"""
+Record incoming MIDI (clock) streams and replay them
+"""
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+import mido
+
+MAGIC = b"PHCLK001"
+# monotonic receive time (ns), message length, message bytes
+RECORD = struct.Struct("<qB3s")
+# Set in the length byte for messages drained with pending()
+DRAINED = 0x80
+
+
+class ClockRecorder:
+    """
+    Append-only log of (timestamp ns, message) records in a memory
+    mapped file.  The file is grown ``capacity`` records at a time and
+    truncated to the records written on close().  Messages longer than
+    three bytes (sysex) are not recorded.  Messages that were drained
+    from a backed-up input (``drained``) are flagged, so a replay can
+    hand them out through pending() again.
+    """
+
+    def __init__(self, path, capacity=65536):
+        self.path = Path(path)
+        self.count = 0
+        self._capacity = capacity
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = 0
+        self._map = None
+        self._grow()
+        self._map[:len(MAGIC)] = MAGIC
+
+    def _grow(self):
+        if self._map is not None:
+            self._map.close()
+        self._size += self._capacity * RECORD.size + (0 if self._size else len(MAGIC))
+        os.ftruncate(self._fd, self._size)
+        self._map = mmap.mmap(self._fd, self._size)
+
+    def write(self, timestamp_ns, data, drained=False):
+        if len(data) > 3:
+            return
+        offset = len(MAGIC) + self.count * RECORD.size
+        if offset + RECORD.size > self._size:
+            self._grow()
+        length = len(data) | DRAINED if drained else len(data)
+        RECORD.pack_into(self._map, offset, timestamp_ns, length, bytes(data))
+        self.count += 1
+
+    def close(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        os.ftruncate(self._fd, len(MAGIC) + self.count * RECORD.size)
+        os.close(self._fd)
+
+
+def _read_records(path):
+    data = Path(path).read_bytes()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a clock recording")
+    return [(ts, raw[:length & ~DRAINED], bool(length & DRAINED))
+            for ts, length, raw in RECORD.iter_unpack(data[len(MAGIC):])]
+
+
+def read_clock_log(path):
+    """Return the (timestamp ns, message bytes) records of a recording."""
+    return [(ts, raw) for ts, raw, _ in _read_records(path)]
+
+
+class RecordingAgent:
+    """
+    Wraps an agent and records every message it receives.  now_ns()
+    returns the receive time of the last message, so the queue sees
+    exactly the timestamps that were written.  Everything else is
+    passed through to the wrapped agent.
+    """
+
+    def __init__(self, agent, path, capacity=65536):
+        self._agent = agent
+        self._recorder = ClockRecorder(path, capacity)
+        self._now = getattr(agent, 'now_ns', time.monotonic_ns)
+        self._last_ns = 0
+
+    def blocking_listen(self):
+        msg = self._agent.blocking_listen()
+        if msg is None:
+            return None
+        self._last_ns = self._now()
+        self._recorder.write(self._last_ns, msg.bytes())
+        return msg
+
+    def pending(self):
+        """The wrapped agent's pending messages, recorded as drained."""
+        pending = getattr(self._agent, 'pending', None)
+        if pending is None:
+            return
+        for msg in pending():
+            self._recorder.write(self._now(), msg.bytes(), drained=True)
+            yield msg
+
+    def now_ns(self):
+        return self._last_ns
+
+    def close(self):
+        self._recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self._agent, name)
+
+
+class ReplayAgent:
+    """
+    Feeds a recording back through blocking_listen().  With
+    ``realtime`` the original inter-arrival times are reproduced,
+    otherwise messages come back as fast as they are asked for.
+    now_ns() always reports the recorded timestamp, so tempo tracking
+    and everything derived from it replays identically.  Returns None
+    at the end of the recording, and captures sends like
+    SimulatedClockAgent.  Messages that were drained by a catch-up when
+    recording come back from pending() after the message before them.
+    """
+
+    def __init__(self, path, realtime=False):
+        self.records = _read_records(path)
+        self.realtime = realtime
+        self.sent = []
+        self._idx = 0
+        self._now = 0
+        self._origin = None
+
+    def open_ports(self, out_str=None, in_str=None):
+        pass
+
+    def blocking_listen(self):
+        if self._idx >= len(self.records):
+            return None
+        timestamp, data, _ = self.records[self._idx]
+        self._idx += 1
+        self._now = timestamp
+        if self.realtime:
+            if self._origin is None:
+                self._origin = time.monotonic_ns() - timestamp
+            delay = self._origin + timestamp - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+        return mido.Message.from_bytes(data)
+
+    def pending(self):
+        records = self.records
+        while self._idx < len(records) and records[self._idx][2]:
+            self._idx += 1
+            yield mido.Message.from_bytes(records[self._idx - 1][1])
+
+    def now_ns(self):
+        return self._now
+
+    def send(self, msg):
+        self.sent.append((self._now, msg))
+
+    def send_raw(self, data):
+        self.sent.append((self._now, data))
+
+    def send_raw_many(self, batch):
+        self.sent.extend((self._now, data) for data in batch)
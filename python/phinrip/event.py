@@ -3,8 +3,11 @@
 """
 Abstract event framework -
 """
-from typing import List
-from heapq import heappush, heappop
+from typing import Deque, Dict, List
+from collections import deque
+from time import perf_counter_ns
+from heapq import heappush, heappop, heapify
+from itertools import count
 
 class Event:
     """
@@ -12,6 +15,8 @@ class Event:
 
     
     """
+    # Whether a catch-up may drop or collapse this event when it is stale
+    may_drop = True
 
     def __init__(self, firetime=None, callback=None):
         self._firetime = firetime
@@ -37,6 +42,21 @@ class Event:
     def __repr__(self):
         return f"{self.time_str()} Generic event @{hex(id(self))}"
 
+    def payload_ids(self):
+        """
+        Small integers identifying what the event acts on, for compact
+        log records.  Override in subclasses.
+        """
+        return ()
+
+    def collapse_key(self):
+        """Stale events sharing a key collapse to the latest one."""
+        return (type(self), self.payload_ids())
+
+    def record(self):
+        """Cheap (firetime, type name, payload ids) summary; no formatting."""
+        return (self._firetime, type(self).__name__, self.payload_ids())
+
     def dict(self):
         d = {
             "firetime" : self.firetime(),
@@ -45,32 +65,203 @@ class Event:
         return d
     
 class DiscreteEventQueue:
+    """
+    Heap of pending events keyed by (firetime, priority, sequence).
+
+    Events sharing a firetime fire in ascending priority, then in the
+    order they were added.  Cancelled entries stay in the heap and are
+    skipped when they surface (lazy deletion); the heap is compacted
+    once they make up more than half of it.
+
+    Fired events are kept in a ring buffer of ``log_size`` entries
+    (unbounded when None) and handed to each sink, e.g. the streaming
+    writers in event_log.py.  With ``metrics`` (an Instrumentation)
+    the time spent firing each event is recorded per event class.
+
+    ``stale_policy`` decides what catch_up() does with events that
+    became due before the last of the ticks it covers: 'late' fires
+    them anyway, 'drop' discards them and 'collapse' keeps only the
+    latest per collapse_key().  Events with may_drop False always fire.
+    """
+    STALE_POLICIES = ('late', 'drop', 'collapse')
 
-    def __init__(self):
+    def __init__(self, log_size=None, sinks=None, metrics=None, stale_policy='late'):
+        if stale_policy not in self.STALE_POLICIES:
+            raise ValueError(f"Unknown stale policy {stale_policy!r}")
         self._queue : List = []
         self._current_time : int = 0
-        self._event_log : List = []
+        self._event_log : Deque = deque(maxlen=log_size)
+        self._sinks : List = list(sinks or [])
+        self.metrics = metrics
+        self._seq = count()
+        self._entries : Dict = {}
+        self._cancelled : int = 0
+        self.stale_policy = stale_policy
+        self.stale_events : int = 0
+        self.dropped_events : int = 0
 
     def tick(self, n=1):
+        self._fire(self._advance(n))
+
+    def catch_up(self, n):
+        """
+        tick(n) for a clock that has fallen behind: events due before
+        the new time are stale and handled by the stale policy.
+        """
+        current_events = self._advance(n)
+        if current_events and current_events[0].firetime() < self._current_time:
+            current_events = self._filter_stale(current_events)
+        self._fire(current_events)
+
+    def _filter_stale(self, events):
+        now = self._current_time
+        policy = self.stale_policy
+        kept = []
+        latest = {}
+        for event in events:
+            if event.firetime() >= now:
+                kept.append(event)
+                continue
+            self.stale_events += 1
+            if policy == 'late' or not event.may_drop:
+                kept.append(event)
+            elif policy == 'drop':
+                self.dropped_events += 1
+            else:
+                key = event.collapse_key()
+                if key in latest:
+                    kept[latest[key]] = None
+                    self.dropped_events += 1
+                latest[key] = len(kept)
+                kept.append(event)
+        return [event for event in kept if event is not None]
+
+    def _fire(self, current_events):
+        self._process_events(current_events)
+        if current_events:
+            self._event_log.extend(current_events)
+            for sink in self._sinks:
+                sink.write_many(current_events)
+
+    def _advance(self, n):
+        """Move the clock forward n ticks and return the due events in order."""
         self._current_time = self._current_time + n
         current_events = []
         while self._queue and (self._queue[0][0] <= self._current_time):
-            e_tick, event = heappop(self._queue)
+            entry = heappop(self._queue)
+            event = entry[3]
+            if event is None:
+                self._cancelled -= 1
+                continue
+            if self._entries.get(event) is entry:
+                del self._entries[event]
             current_events.append(event)
-        self._process_events(current_events)
-        for event in current_events:
-            self._event_log.append(event)
+        return current_events
+
+    def _entry(self, event, priority):
+        entry = [event.firetime(), priority, next(self._seq), event]
+        self._entries[event] = entry
+        return entry
+
+    def add(self, event, priority=0):
+        heappush(self._queue, self._entry(event, priority))
+
+    def add_many(self, events, priority=0):
+        """
+        Schedule a batch of events.  Large batches are appended and the
+        heap rebuilt once instead of pushing each event.
+        """
+        entries = [self._entry(event, priority) for event in events]
+        if len(entries) > len(self._queue) // 4:
+            self._queue.extend(entries)
+            heapify(self._queue)
+        else:
+            for entry in entries:
+                heappush(self._queue, entry)
+
+    def cancel(self, event):
+        """Remove a pending event.  Returns False if it was not pending."""
+        entry = self._entries.pop(event, None)
+        if entry is None:
+            return False
+        entry[3] = None
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._queue):
+            self._queue = [e for e in self._queue if e[3] is not None]
+            heapify(self._queue)
+            self._cancelled = 0
+        return True
+
+    def reschedule(self, event, firetime, priority=None):
+        """Move a pending event (or schedule a new one) to ``firetime``."""
+        entry = self._entries.get(event)
+        if priority is None:
+            priority = entry[1] if entry is not None else 0
+        self.cancel(event)
+        event._firetime = firetime
+        self.add(event, priority)
+
+    def pending(self):
+        """Number of events waiting to fire."""
+        return len(self._queue) - self._cancelled
+
+    def next_firetime(self):
+        """Firetime of the earliest pending event, or None when idle."""
+        while self._queue and self._queue[0][3] is None:
+            heappop(self._queue)
+            self._cancelled -= 1
+        if not self._queue:
+            return None
+        return self._queue[0][0]
+
+    def advance_to_next_event(self, limit=None):
+        """
+        Jump the clock straight to the next tick with a pending event
+        and process it, as tick() would have on reaching that tick.
+        Events already due fire on the following tick, just as when
+        stepping.  Returns the new time, or None when nothing is due at
+        or before ``limit``.
+        """
+        firetime = self.next_firetime()
+        if firetime is None:
+            return None
+        target = max(firetime, self._current_time + 1)
+        if limit is not None and target > limit:
+            return None
+        self.tick(target - self._current_time)
+        return self._current_time
+
+    def run_until(self, t):
+        """
+        Fast-forward to time ``t``, firing events in the same order and
+        at the same times as ticking one step at a time.
+        """
+        while self.advance_to_next_event(t) is not None:
+            pass
+        if t > self._current_time:
+            self.tick(t - self._current_time)
 
-    def add(self, event):
-        event_item = (event.firetime(), event)
-        heappush(self._queue, event_item)
-            
     def current_time(self):
         return self._current_time
 
     def event_log(self):
         return self._event_log
 
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+
+    def close(self):
+        """Flush and close every sink."""
+        for sink in self._sinks:
+            sink.close()
+
     def _process_events(self, eventlist: List):
+        if self.metrics is None:
+            for event in eventlist:
+                event.fire()
+            return
+        fire_histogram = self.metrics.fire_histogram
         for event in eventlist:
+            start = perf_counter_ns()
             event.fire()
+            fire_histogram(type(event)).record(perf_counter_ns() - start)
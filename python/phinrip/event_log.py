@@ -0,0 +1,145 @@
+"""
+Streaming sinks for the DiscreteEventQueue event log
+"""
+import json
+import struct
+from pathlib import Path
+from queue import Full, Queue
+from threading import Thread
+
+_STOP = object()
+
+
+class EventSink:
+    """
+    Writes fired events to a file from a background thread.
+
+    The tick thread only enqueues event references; formatting and I/O
+    happen on the writer thread.  Subclasses implement _write_event().
+
+    At most ``maxsize`` events wait for the writer; when it falls that
+    far behind (stalled disk) further events are counted in
+    ``dropped`` instead of piling up in memory.
+
+    An event that _write_event() cannot format is skipped and counted
+    in ``failed``, with the exception kept in ``last_error``, so one
+    bad record does not end the log.  If the file cannot be opened,
+    close() raises the error.
+    """
+
+    def __init__(self, path, maxsize=65536):
+        self.path = Path(path)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+        self._error = None
+        self._pending = Queue(maxsize)
+        self._thread = Thread(target=self._drain, name=f"{type(self).__name__}:{self.path.name}",
+                              daemon=True)
+        self._thread.start()
+
+    def write(self, event):
+        try:
+            self._pending.put_nowait(event)
+        except Full:
+            self.dropped += 1
+
+    def write_many(self, events):
+        put = self._pending.put_nowait
+        for event in events:
+            try:
+                put(event)
+            except Full:
+                self.dropped += 1
+
+    def close(self):
+        """Write out everything queued so far and stop the writer thread."""
+        if self._thread.is_alive():
+            self._pending.put(_STOP)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _open(self):
+        return self.path.open("wb")
+
+    def _drain(self):
+        try:
+            fh = self._open()
+        except Exception as exc:
+            self._error = exc
+            return
+        with fh:
+            while True:
+                event = self._pending.get()
+                if event is _STOP:
+                    break
+                try:
+                    self._write_event(fh, event)
+                except Exception as exc:
+                    self.failed += 1
+                    self.last_error = exc
+                else:
+                    self.written += 1
+                # Only flush once the backlog is empty
+                if self._pending.empty():
+                    fh.flush()
+
+    def _write_event(self, fh, event):
+        raise NotImplementedError
+
+
+class JsonlEventSink(EventSink):
+    """One Event.dict() JSON object per line."""
+
+    def _open(self):
+        return self.path.open("w", encoding="utf-8")
+
+    def _write_event(self, fh, event):
+        fh.write(json.dumps(event.dict()))
+        fh.write("\n")
+
+
+class BinaryEventSink(EventSink):
+    """
+    Compact fixed-size records of (firetime, type id, two payload ids).
+
+    The first time an event type is seen, a definition record with
+    firetime -1 carries the type name; read_binary_log() resolves the
+    ids back to names.  Missing payload ids are stored as -1.
+    """
+
+    RECORD = struct.Struct("<qHii")
+
+    def __init__(self, path, maxsize=65536):
+        self._type_ids = {}
+        super().__init__(path, maxsize)
+
+    def _write_event(self, fh, event):
+        firetime, type_name, ids = event.record()
+        type_id = self._type_ids.get(type_name)
+        if type_id is None:
+            type_id = len(self._type_ids)
+            self._type_ids[type_name] = type_id
+            name = type_name.encode("utf-8")
+            fh.write(self.RECORD.pack(-1, type_id, len(name), 0))
+            fh.write(name)
+        ids = tuple(ids[:2]) + (-1,) * (2 - len(ids[:2]))
+        fh.write(self.RECORD.pack(firetime, type_id, *ids))
+
+
+def read_binary_log(path):
+    """Yield (firetime, type name, payload ids) from a BinaryEventSink file."""
+    record = BinaryEventSink.RECORD
+    names = {}
+    with Path(path).open("rb") as fh:
+        while True:
+            data = fh.read(record.size)
+            if len(data) < record.size:
+                return
+            firetime, type_id, a, b = record.unpack(data)
+            if firetime == -1:
+                names[type_id] = fh.read(a).decode("utf-8")
+                continue
+            yield (firetime, names[type_id], tuple(i for i in (a, b) if i != -1))
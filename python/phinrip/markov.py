@@ -1,5 +1,8 @@
 
 import random,warnings
+from array import array
+from bisect import bisect_right
+from collections import deque
 from .phrandom import getSeedMaster
 
 
@@ -14,6 +17,13 @@ def getMkRand():
 class MarkovNode:
     """
     Markov node with weighted transitions
+
+    By default a transition is picked by scanning the cumulative
+    weights, which is what older seeds were recorded against.  Calling
+    freeze() builds a Walker/Vose alias table so each draw is constant
+    time.  A frozen node still consumes exactly one value from the
+    "markov" stream per step, so the streams of other nodes and
+    generators stay aligned with an unfrozen run.
     """
     def __init__(self):
         self.transitions = []
@@ -21,18 +31,60 @@ class MarkovNode:
         self.rand = getMkRand()
         self.payload = None
         self.label = None
+        self._alias = None
 
     def _freeze(self):
         self.wsum = 0.0
         for node, weight in self.transitions:
             self.wsum += weight
-        
 
     def add_transition(self, node, weight):
         self.transitions.append((node, weight))
-        self._freeze()
-    
+        # Same left-to-right sum as _freeze(), without revisiting every edge
+        self.wsum += weight
+        self._alias = None
+
+    def freeze(self):
+        """
+        Build the alias table used by next_node().  Adding a transition
+        afterwards drops the table until freeze() is called again.
+        """
+        count = len(self.transitions)
+        if count == 0 or self.wsum <= 0.0:
+            self._alias = None
+            return
+        scaled = [weight * count / self.wsum for _, weight in self.transitions]
+        accept = [1.0] * count
+        alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            accept[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        nodes = [node for node, _ in self.transitions]
+        self._alias = (count,
+                       tuple(nodes),
+                       tuple(accept),
+                       tuple(nodes[i] for i in alias))
+
+    def is_frozen(self):
+        return self._alias is not None
+
     def next_node(self):
+        if self._alias is not None:
+            count, nodes, accept, alias_nodes = self._alias
+            val = self.rand.random() * count
+            idx = int(val)
+            if val - idx < accept[idx]:
+                return nodes[idx]
+            return alias_nodes[idx]
         val = self.rand.random()
         test_val = val * self.wsum
         choice = None
@@ -43,22 +95,300 @@ class MarkovNode:
                 choice = node
                 break
         return choice
-    
+
 
 class MarkovProcess:
-    def __init__(self):
+    def __init__(self, history_size=1024):
         self.nodes = []
-        self._run_history = []
+        # Most recent nodes stepped from; bounded so long runs stay flat
+        self._run_history = deque(maxlen=history_size)
         self.current_node = None
 
     def add_node(self, node):
         self.nodes.append(node)
 
+    def freeze(self):
+        """Switch every node to constant-time alias sampling."""
+        for node in self.nodes:
+            node.freeze()
+
     def step(self):
         self._run_history.append(self.current_node)        
         self.current_node = self.current_node.next_node()
         return self.current_node
 
-    def run(step_count):
+    def run(self, step_count):
         for _ in range(step_count):
             self.step()
+
+    def compile(self):
+        """Return a CompiledMarkov starting at the current node."""
+        return CompiledMarkov.from_nodes(self.nodes, self.current_node)
+
+
+class CompiledMarkov:
+    """
+    Integer-indexed Markov graph.
+
+    Transitions out of state ``s`` live in ``targets[offsets[s]:offsets[s+1]]``
+    with the running weight sums in the matching slice of ``cumulative``.
+    A draw inverts the same cumulative sums that MarkovNode.next_node()
+    scans, with the same "markov" stream, so a compiled graph replays
+    the seeds of the node graph it was built from.
+    """
+
+    def __init__(self, offsets, targets, cumulative, labels=None, start=0):
+        self.offsets = offsets
+        self.targets = targets
+        self.cumulative = cumulative
+        self.labels = labels
+        self.state = start
+        self.rand = getMkRand()
+
+    @classmethod
+    def from_transitions(cls, labels, transition_map, start=None):
+        """
+        Build from a list of state labels and (from, to, weight) triples
+        keyed by those labels, in the format of the JSON transition_map.
+        """
+        index = {label: i for i, label in enumerate(labels)}
+        rows = [[] for _ in labels]
+        for from_label, to_label, weight in transition_map:
+            rows[index[from_label]].append((index[to_label], weight))
+        if start is None:
+            start = transition_map[0][0] if transition_map else labels[0]
+        return cls._from_rows(rows, list(labels), index[start])
+
+    @classmethod
+    def from_nodes(cls, nodes, start=None):
+        """
+        Build from MarkovNode objects.  Nodes only reachable through
+        transitions are picked up as well; labels are the node objects.
+        """
+        nodes = list(nodes)
+        if start is not None and start not in nodes:
+            nodes.insert(0, start)
+        index = {id(node): i for i, node in enumerate(nodes)}
+        rows = []
+        pos = 0
+        while pos < len(nodes):
+            row = []
+            for target, weight in nodes[pos].transitions:
+                if id(target) not in index:
+                    index[id(target)] = len(nodes)
+                    nodes.append(target)
+                row.append((index[id(target)], weight))
+            rows.append(row)
+            pos += 1
+        start_idx = index[id(start)] if start is not None else 0
+        return cls._from_rows(rows, nodes, start_idx)
+
+    @classmethod
+    def _from_rows(cls, rows, labels, start):
+        offsets = array('l', [0])
+        targets = array('l')
+        cumulative = array('d')
+        for row in rows:
+            wsum = 0.0
+            for target, weight in row:
+                wsum += weight
+                targets.append(target)
+                cumulative.append(wsum)
+            offsets.append(len(targets))
+        return cls(offsets, targets, cumulative, labels, start)
+
+    def state_count(self):
+        return len(self.offsets) - 1
+
+    def label(self, state):
+        return self.labels[state] if self.labels is not None else state
+
+    def step(self):
+        lo = self.offsets[self.state]
+        hi = self.offsets[self.state + 1]
+        if lo == hi:
+            raise ValueError(f"Markov state {self.label(self.state)!r} has no transitions.")
+        cumulative = self.cumulative
+        idx = bisect_right(cumulative, self.rand.random() * cumulative[hi - 1], lo, hi)
+        if idx == hi:
+            idx -= 1
+        self.state = self.targets[idx]
+        return self.state
+
+    def walk(self, n):
+        """Advance n steps and return the visited states as an array."""
+        out = array('l', [0]) * n
+        offsets = self.offsets
+        targets = self.targets
+        cumulative = self.cumulative
+        rand = self.rand.random
+        state = self.state
+        for i in range(n):
+            lo = offsets[state]
+            hi = offsets[state + 1]
+            if lo == hi:
+                self.state = state
+                raise ValueError(f"Markov state {self.label(state)!r} has no transitions.")
+            idx = bisect_right(cumulative, rand() * cumulative[hi - 1], lo, hi)
+            if idx == hi:
+                idx -= 1
+            state = targets[idx]
+            out[i] = state
+        self.state = state
+        return out
+
+
+class ContextMarkov:
+    """
+    Markov graph of order k, where the next state depends on the last k
+    states.
+
+    Contexts of each length are packed into an integer with the most
+    recent state least significant, so the key for the last j states
+    is the full key modulo ``state_count ** j``.  Each context maps to
+    a row of CSR arrays laid out like CompiledMarkov.  When the full
+    context has no row the lookup backs off to shorter contexts, down
+    to first-order transitions and finally to an order-0 row drawing
+    states by their total incoming weight, so a state without
+    transitions of its own (e.g. the last note of a trained line) does
+    not end the walk.
+    """
+
+    def __init__(self, labels, transition_map, order=None, start=None):
+        """
+        ``transition_map`` holds (context, to, weight) triples where the
+        context is a single label or a list of labels, oldest first.
+        ``start`` is the initial context; it defaults to the context of
+        the first transition.
+        """
+        self.labels = list(labels)
+        index = {label: i for i, label in enumerate(self.labels)}
+        contexts = []
+        for context, to_label, weight in transition_map:
+            if isinstance(context, str):
+                context = [context]
+            contexts.append((tuple(index[c] for c in context), index[to_label], weight))
+        longest = max((len(c) for c, _, _ in contexts), default=1)
+        if order is None:
+            order = longest
+        if longest > order:
+            raise ValueError(f"Context of length {longest} exceeds order {order}.")
+        self.order = order
+        base = len(self.labels)
+        self._base = base
+        self._mods = [base ** j for j in range(order + 1)]
+        self._rows = [dict() for _ in range(order + 1)]
+        row_edges = []
+        for context, target, weight in contexts:
+            rows = self._rows[len(context)]
+            key = self._encode(context)
+            if key not in rows:
+                rows[key] = len(row_edges)
+                row_edges.append([])
+            row_edges[rows[key]].append((target, weight))
+        # Order-0 fallback: incoming weight per state over the shortest contexts
+        shortest = min((len(c) for c, _, _ in contexts), default=0)
+        incoming = {}
+        for context, target, weight in contexts:
+            if len(context) == shortest:
+                incoming[target] = incoming.get(target, 0) + weight
+        if incoming:
+            self._rows[0][0] = len(row_edges)
+            row_edges.append(sorted(incoming.items()))
+
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self.cumulative = array('d')
+        for edges in row_edges:
+            wsum = 0.0
+            for target, weight in edges:
+                wsum += weight
+                self.targets.append(target)
+                self.cumulative.append(wsum)
+            self.offsets.append(len(self.targets))
+
+        if start is None:
+            start = [self.labels[s] for s in contexts[0][0]] if contexts else [self.labels[0]]
+        elif isinstance(start, str):
+            start = [start]
+        self.reset([index[s] for s in start])
+        self.rand = getMkRand()
+
+    def _encode(self, states):
+        key = 0
+        for s in states:
+            key = key * self._base + s
+        return key
+
+    def reset(self, states):
+        """Set the history to the given states, oldest first."""
+        states = list(states)[-self.order:]
+        self._key = self._encode(states)
+        self._depth = len(states)
+        self.state = states[-1]
+
+    def state_count(self):
+        return self._base
+
+    def context_count(self):
+        return sum(len(rows) for rows in self._rows[1:])
+
+    def label(self, state):
+        return self.labels[state]
+
+    def _row(self, key, depth):
+        rows = self._rows
+        mods = self._mods
+        for j in range(depth, -1, -1):
+            row = rows[j].get(key % mods[j])
+            if row is not None:
+                return row
+        raise ValueError(f"No transitions from Markov state {self.labels[key % self._base]!r}.")
+
+    def step(self):
+        row = self._row(self._key, self._depth)
+        hi = self.offsets[row + 1]
+        cumulative = self.cumulative
+        idx = bisect_right(cumulative, self.rand.random() * cumulative[hi - 1],
+                           self.offsets[row], hi)
+        if idx == hi:
+            idx -= 1
+        state = self.targets[idx]
+        self._key = (self._key % self._mods[self.order - 1]) * self._base + state
+        if self._depth < self.order:
+            self._depth += 1
+        self.state = state
+        return state
+
+    def walk(self, n):
+        """Advance n steps and return the visited states as an array."""
+        out = array('l', [0]) * n
+        offsets = self.offsets
+        targets = self.targets
+        cumulative = self.cumulative
+        rand = self.rand.random
+        full_rows = self._rows[self.order]
+        order = self.order
+        shift_mod = self._mods[order - 1]
+        base = self._base
+        key = self._key
+        depth = self._depth
+        try:
+            for i in range(n):
+                row = full_rows.get(key) if depth == order else None
+                if row is None:
+                    row = self._row(key, depth)
+                hi = offsets[row + 1]
+                idx = bisect_right(cumulative, rand() * cumulative[hi - 1], offsets[row], hi)
+                if idx == hi:
+                    idx -= 1
+                state = targets[idx]
+                out[i] = state
+                key = (key % shift_mod) * base + state
+                if depth < order:
+                    depth += 1
+        finally:
+            self._key = key
+            self._depth = depth
+            self.state = key % base
+        return out
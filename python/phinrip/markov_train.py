@@ -0,0 +1,214 @@
+"""Train MarkovSequence transition maps from a corpus of MIDI files."""
+
+from __future__ import annotations
+
+import json
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .markov import ContextMarkov
+from .note import NoteName
+
+DRUM_CHANNEL = 9
+
+
+def _read_vlq(data: bytes, pos: int) -> tuple[int, int]:
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+
+def _scan_track(data: bytes, pos: int, end: int) -> dict:
+    """Collect note_on pitches per channel from one MTrk chunk body."""
+    lines: dict = {}
+    status = 0
+    while pos < end:
+        _, pos = _read_vlq(data, pos)
+        byte = data[pos]
+        if byte >= 0x80:
+            pos += 1
+            if byte < 0xF0:
+                status = byte
+        elif status == 0:
+            raise ValueError("running status without a status byte")
+        else:
+            byte = status
+        if byte == 0xFF:
+            pos += 1
+            length, pos = _read_vlq(data, pos)
+            pos += length
+        elif byte in (0xF0, 0xF7):
+            length, pos = _read_vlq(data, pos)
+            pos += length
+        elif 0xC0 <= byte < 0xE0:
+            pos += 1
+        else:
+            if byte & 0xF0 == 0x90 and data[pos + 1] > 0:
+                lines.setdefault(byte & 0x0F, []).append(data[pos])
+            pos += 2
+    return lines
+
+
+def iter_note_lines(path: Path | str, channels: Optional[set] = None) -> Iterator[list]:
+    """
+    Yield one list of note numbers per (track, channel) in the file.
+
+    Only note_on messages with a non-zero velocity count as notes.
+    When ``channels`` is None every channel except the GM drum channel
+    is used.  Tracks are scanned straight from the chunk bytes rather
+    than through mido messages, which keeps corpus training fast.
+    """
+    data = Path(path).read_bytes()
+    if data[:4] != b"MThd":
+        raise ValueError(f"{path} is not a Standard MIDI File")
+    pos = 8 + int.from_bytes(data[4:8], "big")
+    while pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        body = pos + 8
+        pos = body + length
+        if chunk_type != b"MTrk":
+            continue
+        for channel, notes in sorted(_scan_track(data, body, min(pos, len(data))).items()):
+            if channels is None and channel == DRUM_CHANNEL:
+                continue
+            if channels is not None and channel not in channels:
+                continue
+            yield notes
+
+
+def count_transitions(notes: Iterable[int], order: int, counts: Counter, wrap: bool = False) -> Counter:
+    """
+    Add the transitions in ``notes`` to ``counts``, keyed by
+    (context, next note) for every context length from 1 to ``order``.
+
+    With ``wrap`` the line also wraps from its last note back to its
+    first as a first-order transition, for material meant to loop.
+    """
+    history: tuple = ()
+    first = None
+    for note in notes:
+        if first is None:
+            first = note
+        for j in range(1, len(history) + 1):
+            counts[(history[-j:], note)] += 1
+        history = (history + (note,))[-order:]
+    if wrap and first is not None:
+        counts[(history[-1:], first)] += 1
+    return counts
+
+
+def _count_file(job) -> tuple:
+    """Return (path, counts, error); unreadable files give an error message."""
+    path, order, channels, wrap = job
+    counts: Counter = Counter()
+    try:
+        for notes in iter_note_lines(path, channels):
+            count_transitions(notes, order, counts, wrap)
+    except (OSError, ValueError, IndexError) as exc:
+        return path, Counter(), f"{type(exc).__name__}: {exc}"
+    return path, counts, None
+
+
+class MarkovTrainer:
+    """
+    Accumulate note transition counts from MIDI files.
+
+    Counts are keyed by note context, so memory grows with the size of
+    the state space rather than with the corpus.  Directories are
+    counted across a process pool and the per-file tables merged as
+    they arrive.
+
+    Unreadable or malformed files do not stop the run; they are listed
+    in ``skipped`` as (path, error) and not counted in ``file_count``.
+    ``wrap`` counts a last-to-first transition for every line; see
+    count_transitions().
+    """
+
+    def __init__(
+        self, order: int = 1, channels: Optional[Iterable[int]] = None, wrap: bool = False
+    ) -> None:
+        if order < 1:
+            raise ValueError("Markov order must be at least 1.")
+        self.order = order
+        self.channels = set(channels) if channels is not None else None
+        self.wrap = wrap
+        self.counts: Counter = Counter()
+        self.file_count = 0
+        self.skipped: list = []
+
+    def add_notes(self, notes: Iterable[int]) -> None:
+        count_transitions(notes, self.order, self.counts, self.wrap)
+
+    def _add_result(self, result: tuple) -> None:
+        path, counts, error = result
+        if error is not None:
+            self.skipped.append((path, error))
+            return
+        self.counts.update(counts)
+        self.file_count += 1
+
+    def add_file(self, path: Path | str) -> None:
+        self._add_result(_count_file((Path(path), self.order, self.channels, self.wrap)))
+
+    def add_directory(
+        self, path: Path | str, processes: Optional[int] = None, chunksize: int = 16
+    ) -> None:
+        """Count every .mid/.midi file below ``path``."""
+        root = Path(path)
+        files = sorted(p for p in root.rglob("*") if p.suffix.lower() in (".mid", ".midi"))
+        jobs = ((p, self.order, self.channels, self.wrap) for p in files)
+        if processes == 1:
+            for result in map(_count_file, jobs):
+                self._add_result(result)
+        else:
+            with Pool(processes) as pool:
+                for result in pool.imap_unordered(_count_file, jobs, chunksize):
+                    self._add_result(result)
+
+    def transition_map(self, min_count: int = 1) -> list:
+        """
+        Return transitions in the JSON transition_map format, longest
+        contexts first so the first entry is a full-order start context.
+        """
+        entries = []
+        for (context, note), count in self.counts.items():
+            if count < min_count:
+                continue
+            labels = [NoteName.from_midi(n) for n in context]
+            source = labels[0] if len(labels) == 1 else labels
+            entries.append(((-len(context), context, note), [source, NoteName.from_midi(note), count]))
+        entries.sort(key=lambda e: e[0])
+        return [entry for _, entry in entries]
+
+    def to_spec(self, notecount: Optional[int] = None, min_count: int = 1) -> dict:
+        """Return a MarkovSequence entry for a sequence-gen JSON file."""
+        transitions = self.transition_map(min_count)
+        notes = sorted({n for (context, note) in self.counts for n in context + (note,)})
+        spec = {
+            "cls": "MarkovSequence",
+            "nmap": {NoteName.from_midi(n): NoteName.from_midi(n) for n in notes},
+            "transition_map": transitions,
+        }
+        if self.order > 1:
+            spec["order"] = self.order
+        if notecount is not None:
+            spec["notecount"] = notecount
+        return spec
+
+    def to_graph(self, min_count: int = 1) -> ContextMarkov:
+        """Return the trained model compiled for sampling."""
+        spec = self.to_spec(min_count=min_count)
+        return ContextMarkov(list(spec["nmap"]), spec["transition_map"], self.order)
+
+    def save_json(self, path: Path | str, notecount: Optional[int] = None, min_count: int = 1) -> Path:
+        destination = Path(path)
+        with destination.open("w", encoding="utf-8") as fh:
+            json.dump({"sequence-gen": [self.to_spec(notecount, min_count)]}, fh, indent=2)
+        return destination
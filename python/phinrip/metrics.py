@@ -0,0 +1,170 @@
+"""
+Low-overhead latency instrumentation
+"""
+import sys
+import threading
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of nanosecond values.
+
+    Values below ``2**sub_bits`` get a bucket each; above that every
+    power of two is split into ``2**(sub_bits-1)`` buckets, so recorded
+    values keep about ``2**-(sub_bits-1)`` relative precision.
+    Recording is a bit_length, a shift and a list increment.
+    """
+
+    def __init__(self, sub_bits=6, max_bits=40):
+        self._sub_bits = sub_bits
+        self._half = 1 << (sub_bits - 1)
+        self._linear = 1 << sub_bits
+        self._size = self._linear + (max_bits - sub_bits) * self._half
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self._size
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self._sub_bits
+        idx = self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+        return idx if idx < self._size else self._size - 1
+
+    def _lowest(self, idx):
+        if idx < self._linear:
+            return idx
+        shift, offset = divmod(idx - self._linear, self._half)
+        return (offset + self._half) << (shift + 1)
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, pct):
+        """Lower bound of the bucket holding the ``pct`` percentile."""
+        if not self.count:
+            return None
+        target = max(1, int(self.count * pct / 100.0 + 0.5))
+        seen = 0
+        for idx, cnt in enumerate(self.counts):
+            seen += cnt
+            if seen >= target:
+                if idx == self._size - 1:
+                    # Values past max_bits all land in the last bucket
+                    return self.max
+                return min(max(self._lowest(idx), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max if self.count else None,
+        }
+
+
+class Instrumentation:
+    """
+    Named latency histograms for the tick loop.
+
+    ExternalSyncQueue records ``tick`` (clock message received to
+    dispatch finished), DiscreteEventQueue ``fire.<EventClass>`` for
+    each _fire_event, and MidiAgent ``send`` plus ``send.lateness``
+    (time from the clock message to the send).  All values are
+    perf_counter_ns differences.
+
+    Plain event counts (e.g. ``catch_up.clocks``) are kept apart from
+    the histograms with count().
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._fire = {}
+        self._counters = {}
+        self.tick_start_ns = None
+        self._export_thread = None
+        self._export_halt = threading.Event()
+
+    def histogram(self, name):
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms[name] = LatencyHistogram()
+        return hist
+
+    def fire_histogram(self, event_cls):
+        hist = self._fire.get(event_cls)
+        if hist is None:
+            hist = self._fire[event_cls] = self.histogram(f"fire.{event_cls.__name__}")
+        return hist
+
+    def record(self, name, value):
+        self.histogram(name).record(value)
+
+    def count(self, name, n=1):
+        self._counters[name] = self._counters.get(name, 0) + n
+
+    def counters(self):
+        return dict(sorted(self._counters.items()))
+
+    def snapshot(self):
+        return {name: hist.summary() for name, hist in sorted(self._histograms.items())}
+
+    def reset(self):
+        for hist in self._histograms.values():
+            hist.reset()
+        self._counters.clear()
+
+    def dump(self, file=None):
+        """Print a table of the histograms, in microseconds."""
+        file = file or sys.stderr
+        print(f"{'name':<28}{'count':>9}{'p50':>10}{'p99':>10}{'p99.9':>10}{'max':>10}",
+              file=file)
+        for name, s in self.snapshot().items():
+            if not s["count"]:
+                continue
+            cols = "".join(f"{s[k] / 1e3:>10.1f}" for k in ("p50", "p99", "p99.9", "max"))
+            print(f"{name:<28}{s['count']:>9}{cols}", file=file)
+        for name, value in self.counters().items():
+            print(f"{name:<28}{value:>9}", file=file)
+
+    def start_export(self, interval, callback, reset=False):
+        """Call ``callback(snapshot)`` every ``interval`` seconds on a thread."""
+        self.stop_export()
+        self._export_halt.clear()
+
+        def export():
+            while not self._export_halt.wait(interval):
+                callback(self.snapshot())
+                if reset:
+                    self.reset()
+
+        self._export_thread = threading.Thread(target=export, name="metrics-export",
+                                               daemon=True)
+        self._export_thread.start()
+
+    def stop_export(self):
+        if self._export_thread is not None:
+            self._export_halt.set()
+            self._export_thread.join()
+            self._export_thread = None
@@ -2,17 +2,27 @@
 """
 """
 
+import time
+from time import perf_counter_ns
+
 import mido
 
 from .event import DiscreteEventQueue
+from .tempo import TempoTracker
+
+# Default event log length for queues driven by a live clock
+LIVE_LOG_SIZE = 4096
 
 
 class MidiAgent:
-    def __init__(self, out_str=None, in_str=None):
+    def __init__(self, out_str=None, in_str=None, metrics=None):
         self._out_str = out_str
         self._in_str = in_str
         self.in_port = None
         self.out_port = None
+        self._raw_writer = None
+        # Instrumentation; records send time and lateness when set
+        self.metrics = metrics
 
     def open_ports(self, out_str=None, in_str=None):
         if out_str:
@@ -21,30 +31,226 @@ class MidiAgent:
             self._in_str = in_str
         if self._out_str:
             self.out_port = mido.open_output(self._out_str)
+            self._raw_writer = self._find_raw_writer(self.out_port)
         if self._in_str:
             self.in_port = mido.open_input(self._in_str)
 
+    def _find_raw_writer(self, port):
+        """
+        The rtmidi backend can take encoded bytes directly; other
+        backends get the bytes parsed back into a message.
+        """
+        rt = getattr(port, '_rt', None)
+        if rt is not None and hasattr(rt, 'send_message'):
+            return rt.send_message
+        return lambda data: port.send(mido.Message.from_bytes(data))
+
     def blocking_listen(self):
         return self.in_port.receive()
 
+    def pending(self):
+        """Messages already waiting on the input, without blocking."""
+        return self.in_port.iter_pending()
+
+    def now_ns(self):
+        """Monotonic timestamp used to stamp received messages."""
+        return time.monotonic_ns()
+
     def send(self, midimsg):
-        self.out_port.send(msg)
+        if self.metrics is None:
+            self.out_port.send(midimsg)
+            return
+        start = perf_counter_ns()
+        self.out_port.send(midimsg)
+        self._record_send(start)
+
+    def send_raw(self, data):
+        """Send one already encoded message (bytes) without mido validation."""
+        if self.metrics is None:
+            self._raw_writer(data)
+            return
+        start = perf_counter_ns()
+        self._raw_writer(data)
+        self._record_send(start)
+
+    def send_raw_many(self, batch):
+        """Send a batch of encoded messages in one call."""
+        writer = self._raw_writer
+        if self.metrics is None:
+            for data in batch:
+                writer(data)
+            return
+        start = perf_counter_ns()
+        for data in batch:
+            writer(data)
+        self._record_send(start)
+
+    def _record_send(self, start):
+        metrics = self.metrics
+        metrics.histogram('send').record(perf_counter_ns() - start)
+        if metrics.tick_start_ns is not None:
+            metrics.histogram('send.lateness').record(start - metrics.tick_start_ns)
 
 class ExternalSyncQueue:
-    def __init__(self, agent):
-        self._queue = DiscreteEventQueue()
+    """
+    Event queue driven by an external MIDI clock.  ``queue_cls`` selects
+    the scheduler backend, e.g. DiscreteEventQueue (binary heap) or
+    TimingWheelQueue for dense schedules; ``queue_args`` (log_size,
+    sinks, ...) are passed to it.  The event log keeps the last
+    LIVE_LOG_SIZE events unless ``log_size`` says otherwise.
+
+    Only clock messages advance time, and only while the transport is
+    running.  Start/continue/stop toggle the transport and song
+    position pointers are tracked in clock ticks.  With
+    ``wait_for_start`` clocks are ignored until a start or continue.
+
+    ``metrics`` (an Instrumentation) is shared with the event queue and
+    records how long each message takes from receipt to dispatch done.
+
+    With ``catch_up``, clocks that piled up on the input while a tick
+    was being handled (agents with pending()) are drained together
+    and applied with one queue.catch_up(n); ``stale_policy`` in
+    ``queue_args`` says what happens to the events they skipped over.
+    Each clock drained while the transport runs counts as a deadline
+    miss.
+    """
+    def __init__(self, agent, queue_cls=DiscreteEventQueue,
+                 wait_for_start=False, metrics=None, catch_up=False, **queue_args):
+        # A live queue runs for hours; keep only the recent event log
+        queue_args.setdefault('log_size', LIVE_LOG_SIZE)
+        self._queue = queue_cls(metrics=metrics, **queue_args)
         self._agent = agent
+        self.metrics = metrics
         self._keep_running = True
+        self._running = not wait_for_start
+        self.song_position = 0
+        self.tempo = TempoTracker()
+        self._clock = getattr(agent, 'now_ns', time.monotonic_ns)
+        self.catch_up = catch_up
+        self._pending = getattr(agent, 'pending', None) if catch_up else None
+        self.deadline_misses = 0
 
     def run(self):
         while self._keep_running:
             msg = self._agent.blocking_listen()
-            # TODO: check msg --
-            # Assume it is a tick message for now.
-            self._queue.tick()
+            if msg is None:
+                # Finite sources (simulated or replayed clocks) end with None
+                break
+            self.process(msg)
+
+    def process(self, msg, timestamp_ns=None, backlog=None):
+        """
+        One step of run(): handle ``msg``, then with ``catch_up`` drain
+        the messages already waiting behind it, and record the tick
+        latency when instrumented.  ``backlog`` replaces the agent's
+        pending() for loops that receive messages some other way.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            self.handle_message(msg, timestamp_ns)
+            self._drain_backlog(backlog)
+            return
+        start = metrics.tick_start_ns = perf_counter_ns()
+        self.handle_message(msg, timestamp_ns)
+        self._drain_backlog(backlog)
+        metrics.histogram('tick').record(perf_counter_ns() - start)
+
+    def _drain_backlog(self, backlog):
+        if not self.catch_up:
+            return
+        if backlog is None:
+            if self._pending is None:
+                return
+            backlog = self._pending()
+        self._catch_up(backlog)
+
+    def _catch_up(self, messages):
+        clocks = 0
+        messages = iter(messages)
+        # Check before taking each message, so nothing is drained past a stop
+        while self._keep_running:
+            msg = next(messages, None)
+            if msg is None:
+                break
+            if msg.type == 'clock':
+                clocks += 1
+                continue
+            if clocks:
+                self._coalesce(clocks)
+                clocks = 0
+            self.handle_message(msg)
+        if clocks and self._keep_running:
+            self._coalesce(clocks)
 
-    def add(self, event):
-        self._queue.add(event)
+    def _coalesce(self, n):
+        self.tempo.coast(n)
+        if not self._running:
+            # Clocks while stopped do not move time, so nothing was late
+            return
+        self.deadline_misses += n
+        if self.metrics is not None:
+            self.metrics.count('catch_up')
+            self.metrics.count('catch_up.clocks', n)
+        self.song_position += n
+        self._queue.catch_up(n)
+
+    def handle_message(self, msg, timestamp_ns=None):
+        kind = msg.type
+        if kind == 'clock':
+            self.tempo.clock(self._clock() if timestamp_ns is None else timestamp_ns)
+            if self._running:
+                self.song_position += 1
+                self._queue.tick()
+        elif kind == 'start':
+            self._running = True
+            self.song_position = 0
+            self.tempo.reset()
+        elif kind == 'continue':
+            self._running = True
+            self.tempo.reset()
+        elif kind == 'stop':
+            self._running = False
+        elif kind == 'songpos':
+            # Song position is counted in sixteenth notes, 6 clocks each
+            self.song_position = msg.pos * 6
+        # Anything else (notes, CCs, active sensing) does not move time
+
+    def is_running(self):
+        return self._running
+
+    def stale_events(self):
+        """Events that came due during coalesced ticks, and how many were dropped."""
+        return self._queue.stale_events, self._queue.dropped_events
+
+    def bpm(self):
+        return self.tempo.bpm()
+
+    def predicted_next_tick(self):
+        """Predicted monotonic time (ns) of the next clock message."""
+        return self.tempo.predict()
+
+    def run_until(self, t):
+        """
+        Run against a virtual clock, jumping between ticks that have
+        events, until time ``t`` (no limit when None) or until stop()
+        is called.
+        """
+        while self._keep_running:
+            if self._queue.advance_to_next_event(t) is None:
+                break
+        return self._queue.current_time()
+
+    def add(self, event, priority=0):
+        self._queue.add(event, priority)
+
+    def add_many(self, events, priority=0):
+        self._queue.add_many(events, priority)
+
+    def cancel(self, event):
+        return self._queue.cancel(event)
+
+    def reschedule(self, event, firetime, priority=None):
+        self._queue.reschedule(event, firetime, priority)
 
     def current_time(self):
         return self._queue.current_time()
@@ -52,5 +258,11 @@ class ExternalSyncQueue:
     def event_log(self):
         return self._queue.event_log()
 
+    def close(self):
+        self._queue.close()
+
     def stop(self):
         self._keep_running = False
+
+    def is_stopped(self):
+        return not self._keep_running
@@ -0,0 +1,202 @@
+"""
+Threaded MIDI output with batching and backpressure
+"""
+import threading
+import time
+from collections import deque
+
+from .midi_queue import MidiAgent
+
+# 31250 baud, 10 bits on the wire per byte
+MIDI_WIRE_BYTES_PER_SEC = 3125
+
+
+def encode_running_status(batch):
+    """
+    Concatenate encoded messages into one byte stream, dropping status
+    bytes that repeat the running status.  Real-time bytes leave the
+    running status alone; system common messages cancel it.
+    """
+    out = bytearray()
+    running = None
+    for data in batch:
+        status = data[0]
+        if status >= 0xF8:
+            out += data
+            continue
+        if status == running:
+            out += data[1:]
+        else:
+            out += data
+        running = status if status < 0xF0 else None
+    return bytes(out)
+
+
+class MidiSender:
+    """
+    Bounded output queue drained by a dedicated sender thread.
+
+    Producers append (timestamp, bytes) to a deque, which needs no lock
+    under the GIL, and set a wake-up event.  Each time the thread wakes
+    it takes everything queued, normally the messages of one tick, and
+    writes them as one batch.  Messages go to ``writer`` one at a
+    time, or with ``stream_writer`` as a single byte stream, optionally
+    using running status.  ``rate_limit`` (bytes/s, e.g.
+    MIDI_WIRE_BYTES_PER_SEC) paces writes to the wire bandwidth.
+
+    When the queue holds ``maxsize`` messages new ones are dropped and
+    counted.  Messages written more than ``late_ns`` after they were
+    queued are counted as late.
+
+    If the writer raises, for instance because the port was unplugged,
+    the thread stops and the exception is raised again from the next
+    put(), put_many() or close().
+    """
+
+    def __init__(self, writer=None, stream_writer=None, maxsize=1024,
+                 running_status=False, rate_limit=None, late_ns=2000000):
+        if writer is None and stream_writer is None:
+            raise ValueError("MidiSender needs a writer or a stream_writer.")
+        if running_status and stream_writer is None:
+            raise ValueError("Running status needs a stream_writer.")
+        self._writer = writer
+        self._stream_writer = stream_writer
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._halt = False
+        self._error = None
+        self.maxsize = maxsize
+        self.running_status = running_status
+        self.rate_limit = rate_limit
+        self.late_ns = late_ns
+        self._wire_free_ns = 0
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.late = 0
+        self._thread = threading.Thread(target=self._run, name="midi-sender", daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        self._check_error()
+        if len(self._pending) >= self.maxsize:
+            self.dropped += 1
+            return False
+        self._pending.append((time.monotonic_ns(), data))
+        self._wake.set()
+        return True
+
+    def put_many(self, batch):
+        self._check_error()
+        now = time.monotonic_ns()
+        room = self.maxsize - len(self._pending)
+        for data in batch:
+            if room <= 0:
+                self.dropped += 1
+                continue
+            self._pending.append((now, data))
+            room -= 1
+        self._wake.set()
+
+    def depth(self):
+        return len(self._pending)
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "sent": self.sent,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "late": self.late,
+        }
+
+    def close(self):
+        """Send what is queued and stop the thread."""
+        self._halt = True
+        self._wake.set()
+        self._thread.join()
+        self._check_error()
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _take(self):
+        batch = []
+        pending = self._pending
+        while True:
+            try:
+                batch.append(pending.popleft())
+            except IndexError:
+                return batch
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            batch = self._take()
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as exc:
+                    self._error = exc
+                    return
+            if self._halt and not self._pending:
+                return
+
+    def _write(self, batch):
+        if self._stream_writer is not None:
+            datas = [data for _, data in batch]
+            stream = encode_running_status(datas) if self.running_status else b"".join(datas)
+            self._pace(len(stream))
+            self._stream_writer(stream)
+        else:
+            for _, data in batch:
+                self._pace(len(data))
+                self._writer(data)
+        now = time.monotonic_ns()
+        for queued, _ in batch:
+            if now - queued > self.late_ns:
+                self.late += 1
+        self.sent += len(batch)
+        self.batches += 1
+
+    def _pace(self, size):
+        if not self.rate_limit:
+            return
+        now = time.monotonic_ns()
+        if self._wire_free_ns > now:
+            time.sleep((self._wire_free_ns - now) / 1e9)
+            now = self._wire_free_ns
+        self._wire_free_ns = now + size * 1000000000 // self.rate_limit
+
+
+class ThreadedMidiAgent(MidiAgent):
+    """
+    MidiAgent whose output goes through a MidiSender, so the tick
+    thread only enqueues.  ``sender_args`` (maxsize, rate_limit, ...)
+    are passed to the MidiSender created by open_ports().
+    """
+
+    def __init__(self, out_str=None, in_str=None, metrics=None, **sender_args):
+        super().__init__(out_str, in_str, metrics)
+        self._sender_args = sender_args
+        self.sender = None
+
+    def open_ports(self, out_str=None, in_str=None):
+        super().open_ports(out_str, in_str)
+        if self.out_port is not None:
+            self.sender = MidiSender(self._raw_writer, **self._sender_args)
+
+    def send(self, midimsg):
+        self.sender.put(bytes(midimsg.bytes()))
+
+    def send_raw(self, data):
+        self.sender.put(data)
+
+    def send_raw_many(self, batch):
+        self.sender.put_many(batch)
+
+    def close(self):
+        if self.sender is not None:
+            self.sender.close()
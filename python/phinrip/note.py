@@ -14,13 +14,31 @@ class NoteName:
         "B": 11,
     }
 
+    _SHARP_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+    # Filled in below: the 128 sharp spellings, and name -> number for
+    # every spelling parsed so far
+    _MIDI_NAMES = ()
+    _NAME_CACHE = {}
+
     @classmethod
     def to_midi(cls, name: str) -> int:
         """
         Convert a note name like ``C#4`` or ``Eb3`` into its MIDI note number.
 
-        Octaves follow the standard where C4 == MIDI 60.
+        Octaves follow the standard where C4 == MIDI 60.  Results are
+        cached, so repeated names cost a dict lookup.
         """
+        try:
+            return cls._NAME_CACHE[name]
+        except (KeyError, TypeError):
+            pass
+        value = cls._parse(name)
+        cls._NAME_CACHE[name] = value
+        return value
+
+    @classmethod
+    def _parse(cls, name: str) -> int:
         if len(name) < 2:
             raise ValueError(f"Invalid note name '{name}'.")
         name = name.strip()
@@ -49,28 +67,94 @@ class NoteName:
             raise ValueError(f"Note '{name}' resolves outside MIDI range 0-127.")
         return midi_number
 
+    @classmethod
+    def from_midi(cls, value: int) -> str:
+        """
+        Convert a MIDI note number into a name like ``C#4``, spelling
+        accidentals as sharps.  ``to_midi(from_midi(n)) == n``.
+        """
+        if not 0 <= value <= 127:
+            raise ValueError(f"MIDI note {value} outside range 0-127.")
+        return cls._MIDI_NAMES[value]
+
+    @classmethod
+    def _build_tables(cls) -> None:
+        names = []
+        for value in range(128):
+            octave, offset = divmod(value, 12)
+            names.append(f"{cls._SHARP_NAMES[offset]}{octave - 1}")
+        cls._MIDI_NAMES = tuple(names)
+        cls._NAME_CACHE.update((name, value) for value, name in enumerate(names))
+
+
+NoteName._build_tables()
 
 
 class Note:
+    """
+    Immutable note: MIDI pitch value, velocity, length and channel.
+
+    Notes are interned, one instance per (pitch value, velocity, length,
+    channel), so ``Note('C3') is Note('C3')`` and generators hand out
+    shared objects instead of allocating one per step.  Pitch names are
+    parsed once and transpose() results are cached on each note.
+    """
+
+    __slots__ = ("_pitch_val", "_velocity", "_length", "_channel", "_shifts")
 
-    def __init__(self, pitch='C3', velocity=96, length=None):
-        self._pitch = pitch
-        self._pitch_val = NoteName.to_midi(pitch)
-        self._velocity = velocity
-        self._length = length
-        self._channel = 0
+    _interned = {}
+
+    def __new__(cls, pitch='C3', velocity=96, length=None, channel=0):
+        return cls.from_value(NoteName.to_midi(pitch), velocity, length, channel)
+
+    @classmethod
+    def from_value(cls, value, velocity=96, length=None, channel=0):
+        """The note for a MIDI pitch value, without going through a name."""
+        key = (cls, value, velocity, length, channel)
+        note = cls._interned.get(key)
+        if note is None:
+            note = object.__new__(cls)
+            setter = object.__setattr__
+            setter(note, "_pitch_val", value)
+            setter(note, "_velocity", velocity)
+            setter(note, "_length", length)
+            setter(note, "_channel", channel)
+            setter(note, "_shifts", {})
+            cls._interned[key] = note
+        return note
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (type(self).from_value,
+                (self._pitch_val, self._velocity, self._length, self._channel))
 
     def __repr__(self):
-        return f"Note('{self._pitch}', {self._velocity})"
+        return f"Note('{self.pitch_name()}', {self._velocity})"
 
     def pitch_value(self):
         return self._pitch_val
 
+    def pitch_name(self):
+        """Sharp spelling of the pitch, or '' outside the MIDI range."""
+        if 0 <= self._pitch_val <= 127:
+            return NoteName._MIDI_NAMES[self._pitch_val]
+        return ''
+
     def velocity(self):
         return self._velocity
 
+    def length(self):
+        return self._length
+
+    def channel(self):
+        return self._channel
+
     def transpose(self, semi):
-        n = Note(self._pitch, self._velocity, self._length)
-        n._pitch = ''
-        n._pitch_val = self._pitch_val + semi
-        return n
+        try:
+            return self._shifts[semi]
+        except KeyError:
+            note = self._shifts[semi] = self.from_value(
+                self._pitch_val + semi, self._velocity, self._length, self._channel)
+            return note
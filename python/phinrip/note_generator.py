@@ -1,5 +1,7 @@
 
 import itertools,inspect,sys
+from array import array
+from collections import deque
 
 """
 Generate notes
@@ -8,7 +10,7 @@ Generate notes
 """
 
 from .note import Note
-from .markov import MarkovProcess, MarkovNode
+from .markov import MarkovProcess, MarkovNode, ContextMarkov
 
 CLASS_MAP = None
 
@@ -34,9 +36,12 @@ class NoteGenerator:
     """
     Iterator class that generates untimed sequence of notes to feed into
     the step sequencer
+
+    Only the last ``history_size`` notes are kept in the history, so
+    generating indefinitely uses constant memory.
     """
-    def __init__(self, notecount=None, **args):
-        self._history = []
+    def __init__(self, notecount=None, history_size=1024, **args):
+        self._history = deque(maxlen=history_size)
         self.count = notecount
 
     def __iter__(self):
@@ -54,6 +59,56 @@ class NoteGenerator:
     def _generate_note(self):
         return Note('C3')
 
+    def take_block(self, n):
+        """
+        Generate up to n notes in one call, returned as parallel arrays
+        of pitch values, velocities and channels.  The arrays are
+        shorter than n once ``count`` runs out or the generator ends.
+
+        Generators drawing from a fixed set of notes implement
+        _block_palette() and _block_indices() and skip the per-note
+        path; others fall back to calling next() n times.
+        """
+        palette = self._block_palette()
+        if palette is None:
+            notes = []
+            for _ in range(n):
+                note = next(self)
+                if note is None:
+                    break
+                notes.append(note)
+            return (array('B', [note.pitch_value() for note in notes]),
+                    array('B', [note.velocity() for note in notes]),
+                    array('B', [note.channel() for note in notes]))
+        if self.count is not None:
+            n = max(0, min(n, self.count))
+            self.count -= n
+        indices = self._block_indices(n)
+        maxlen = self._history.maxlen
+        recent = indices if maxlen is None else indices[-maxlen:]
+        self._history.extend(map(palette.__getitem__, recent))
+        pitches, velocities, channels = self._palette_columns(palette)
+        return (array('B', map(pitches.__getitem__, indices)),
+                array('B', map(velocities.__getitem__, indices)),
+                array('B', map(channels.__getitem__, indices)))
+
+    def _palette_columns(self, palette):
+        columns = getattr(self, '_columns', None)
+        if columns is None or columns[0] is not palette:
+            columns = self._columns = (palette,
+                                       [note.pitch_value() for note in palette],
+                                       [note.velocity() for note in palette],
+                                       [note.channel() for note in palette])
+        return columns[1:]
+
+    def _block_palette(self):
+        """Notes that _block_indices() indexes into, or None."""
+        return None
+
+    def _block_indices(self, n):
+        """Array of n palette indices, advancing the generator."""
+        raise NotImplementedError
+
     @classmethod
     def from_json(cls, json):
         return cls(*json)
@@ -80,24 +135,56 @@ class Arpeggiator(NoteGenerator):
             self.idx = 0
         return note
 
+    def _block_palette(self):
+        return self._notelist
+
+    def _block_indices(self, n):
+        size = len(self._notelist)
+        start = self.idx
+        tiled = array('l', range(size)) * ((start + n) // size + 1)
+        self.idx = (start + n) % size
+        return tiled[start:start + n]
+
 class MarkovSequence(NoteGenerator):
     """
     Generate a sequence based on a
     Markov process
+
+    With ``compiled`` (the default) steps are drawn from an
+    integer-indexed CompiledMarkov; the node graph is still built and
+    produces the same notes for the same seed.
+
+    For ``order`` above 1 a transition may start from a list of labels,
+    oldest first, e.g. ``[["do", "re"], "mi", 10]``.  Missing contexts
+    fall back to shorter ones, down to single-label transitions.  Maps
+    with dead ends (labels reached but never left, as in trained
+    corpora) are sampled with the same fallback, ending in an order-0
+    draw by incoming weight.
     """
 
-    def __init__(self, nmap ,transition_map, **args):
+    def __init__(self, nmap ,transition_map, compiled=True, order=1, **args):
         """
         """
         super().__init__(**args)
         self.nodes = {}
         self.start_node = None
         self.markov = MarkovProcess()
+        self.order = order
         for k,v in nmap.items():
             n = MarkovNode()
-            n.label=n
+            n.label=k
             n.payload=Note(v)
             self.nodes[k] = n
+            self.markov.add_node(n)
+        self.graph = None
+        if order > 1 or (compiled and self._has_dead_end(transition_map)):
+            if not compiled:
+                raise ValueError("Higher-order Markov sequences must be compiled.")
+            self.graph = ContextMarkov(list(self.nodes), transition_map, order)
+            self._payloads = [self.nodes[k].payload for k in self.graph.labels]
+            self.start_node = self.nodes[self.graph.label(self.graph.state)]
+            self.markov.current_node = self.start_node
+            return
         for from_node, to_node, w in transition_map:
             f = self.nodes[from_node]
             if self.start_node == None:
@@ -106,9 +193,24 @@ class MarkovSequence(NoteGenerator):
             f.add_transition(t, w)
 
         self.markov.current_node = self.start_node
+        if compiled:
+            self.graph = self.markov.compile()
+            self._payloads = [n.payload for n in self.graph.labels]
+
+    @staticmethod
+    def _has_dead_end(transition_map):
+        sources = {tuple(f) if isinstance(f, list) else f for f, _, _ in transition_map}
+        return any(t not in sources for _, t, _ in transition_map)
 
     def _generate_note(self):
+        if self.graph is not None:
+            return self._payloads[self.graph.step()]
         n = self.markov.step()
         return n.payload
 
-        
+    def _block_palette(self):
+        # The uncompiled node graph steps one note at a time
+        return self._payloads if self.graph is not None else None
+
+    def _block_indices(self, n):
+        return self.graph.walk(n)
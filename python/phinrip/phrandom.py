@@ -22,7 +22,8 @@ class SeedMaster:
     def __init__(self, seed=None):
         named_randoms = NAMED_RANDOMS
         if seed == None:
-            self.seed = int(time.time()) + 0x71e00000
+            seed = int(time.time()) + 0x71e00000
+        self.seed = seed
         self.master_random = random.Random(self.seed)
         self.rng_map = {}
         for name in NAMED_RANDOMS:
@@ -0,0 +1,86 @@
+"""
+Simulated MIDI clock agent for running controllers without MIDI hardware
+"""
+import random
+import time
+from itertools import cycle
+
+import mido
+
+
+class SimulatedClockAgent:
+    """
+    Stand-in for MidiAgent that produces MIDI clock at ``bpm`` and
+    captures everything sent to it with a timestamp.
+
+    Clock times are laid out on a virtual timeline: tick k is due at
+    k * period, plus gaussian jitter with a ``jitter_ns`` standard
+    deviation, or following recorded inter-arrival ``intervals`` (ns,
+    cycled).  In real-time mode blocking_listen() sleeps until each
+    tick is due; with ``max_speed`` it returns immediately and now_ns()
+    reports the virtual time, so tempo tracking still sees the
+    intended clock.  After ``max_ticks`` clocks blocking_listen()
+    returns None, which ends ExternalSyncQueue.run().
+    """
+
+    def __init__(self, bpm=120, ppqn=24, jitter_ns=0, intervals=None,
+                 max_speed=False, max_ticks=None, send_start=True, seed=None):
+        self.bpm = bpm
+        self.ppqn = ppqn
+        self.period_ns = 60e9 / (bpm * ppqn)
+        self.jitter_ns = jitter_ns
+        self.max_speed = max_speed
+        self.max_ticks = max_ticks
+        self.ticks_sent = 0
+        self.sent = []
+        self._intervals = cycle(intervals) if intervals else None
+        self._rng = random.Random(seed)
+        self._pending_start = send_start
+        self._clock_msg = mido.Message('clock')
+        self._origin = None
+        self._due = 0.0
+        self._virtual_now = 0
+
+    def open_ports(self, out_str=None, in_str=None):
+        pass
+
+    def _next_due(self):
+        if self._intervals is not None:
+            self._due += next(self._intervals)
+            return self._due
+        self._due = self.ticks_sent * self.period_ns
+        if self.jitter_ns:
+            return self._due + self._rng.gauss(0.0, self.jitter_ns)
+        return self._due
+
+    def blocking_listen(self):
+        if self._origin is None:
+            self._origin = time.monotonic_ns()
+        if self._pending_start:
+            self._pending_start = False
+            return mido.Message('start')
+        if self.max_ticks is not None and self.ticks_sent >= self.max_ticks:
+            return None
+        due = int(self._next_due())
+        self.ticks_sent += 1
+        self._virtual_now = self._origin + due
+        if not self.max_speed:
+            delay = self._virtual_now - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+        return self._clock_msg
+
+    def now_ns(self):
+        if self.max_speed:
+            return self._virtual_now
+        return time.monotonic_ns()
+
+    def send(self, msg):
+        self.sent.append((self.now_ns(), msg))
+
+    def send_raw(self, data):
+        self.sent.append((self.now_ns(), data))
+
+    def send_raw_many(self, batch):
+        now = self.now_ns()
+        self.sent.extend((now, data) for data in batch)
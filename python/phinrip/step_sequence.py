@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import struct
+from array import array
 from dataclasses import dataclass
 from enum import Enum
 from fractions import Fraction
 from pathlib import Path
-from typing import List, Optional
+from typing import Optional
 
 from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+from mido.midifiles.meta import meta_charset
 
 from .note import Note
 from .note_generator import NoteGenerator, generator_map
@@ -70,6 +73,179 @@ class StepEvent:
         return self.note is None
 
 
+class StepBuffer:
+    """
+    Columnar step storage: one byte per step in each of the note,
+    velocity, channel and rest-flag arrays, instead of a StepEvent
+    object per step.  Rests store note and velocity 0.
+    """
+
+    def __init__(self) -> None:
+        self.notes = array("B")
+        self.velocities = array("B")
+        self.channels = array("B")
+        self.rests = array("B")
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __getitem__(self, idx: int) -> StepEvent:
+        if self.rests[idx]:
+            return StepEvent.rest()
+        return StepEvent(self.notes[idx], self.velocities[idx], self.channels[idx])
+
+    def __iter__(self):
+        for idx in range(len(self.notes)):
+            yield self[idx]
+
+    def append(self, event: StepEvent) -> None:
+        if event.is_rest():
+            self.append_rest()
+        else:
+            self.append_note(event.note, event.velocity, event.channel)
+
+    def append_note(self, note: int, velocity: int = 96, channel: int = 0) -> None:
+        if not (0 <= note <= 127 and 0 <= velocity <= 127 and 0 <= channel <= 15):
+            raise ValueError(
+                f"Step out of range: note {note}, velocity {velocity}, channel {channel}."
+            )
+        self.notes.append(note)
+        self.velocities.append(velocity)
+        self.channels.append(channel)
+        self.rests.append(0)
+
+    def append_rest(self) -> None:
+        self.notes.append(0)
+        self.velocities.append(0)
+        self.channels.append(0)
+        self.rests.append(1)
+
+    def extend(self, notes, velocities=None, channels=None, rests=None) -> None:
+        """
+        Append steps from parallel sequences (arrays, lists, bytes...).
+        Missing columns default to velocity 96, channel 0 and no rests;
+        rest steps have their note and velocity stored as 0.
+        """
+        try:
+            notes = array("B", notes)
+            count = len(notes)
+            velocities = array("B", [96]) * count if velocities is None else array("B", velocities)
+            channels = array("B", [0]) * count if channels is None else array("B", channels)
+            rests = array("B", [0]) * count if rests is None else array("B", map(bool, rests))
+        except OverflowError as exc:
+            raise ValueError("Step values out of MIDI range.") from exc
+        if not len(velocities) == len(channels) == len(rests) == count:
+            raise ValueError("Step columns must have the same length.")
+        if count and (max(notes) > 127 or max(velocities) > 127 or max(channels) > 15):
+            raise ValueError("Step values out of MIDI range.")
+        if any(rests):
+            for idx in range(count):
+                if rests[idx]:
+                    notes[idx] = 0
+                    velocities[idx] = 0
+        self.notes.extend(notes)
+        self.velocities.extend(velocities)
+        self.channels.extend(channels)
+        self.rests.extend(rests)
+
+    def clear(self) -> None:
+        del self.notes[:], self.velocities[:], self.channels[:], self.rests[:]
+
+    def nbytes(self) -> int:
+        return 4 * len(self.notes)
+
+
+def _vlq(value: int) -> bytes:
+    """MIDI variable-length quantity: 7 bits per byte, high bit = more."""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+class _SmfTrackEncoder:
+    """
+    Encodes an MTrk chunk body straight into a bytearray, producing the
+    same bytes as mido's write_track: VLQ delta times before every
+    event, running status for channel messages, reset by meta events.
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._running = None
+        self._vlqs = {}
+
+    def vlq(self, value: int) -> bytes:
+        encoded = self._vlqs.get(value)
+        if encoded is None:
+            encoded = self._vlqs[value] = _vlq(value)
+        return encoded
+
+    def meta(self, delta: int, raw: bytes) -> None:
+        """Append an encoded meta event (MetaMessage.bytes())."""
+        self.data += self.vlq(delta)
+        self.data += raw
+        self._running = None
+
+    def channel(self, delta: int, raw: bytes) -> None:
+        """Append an encoded channel message, eliding a repeated status."""
+        self.data += self.vlq(delta)
+        status = raw[0]
+        if status == self._running:
+            self.data += raw[1:]
+        else:
+            self.data += raw
+        self._running = status if status < 0xF0 else None
+
+    def steps(self, steps: StepBuffer, step_ticks: int, start: int = 0,
+              stop: Optional[int] = None, rest: int = 0) -> int:
+        """
+        Append note_on/note_off pairs for steps[start:stop], with
+        ``rest`` ticks of rest already pending.  Returns the rest
+        pending after the last step.
+        """
+        data = self.data
+        vlq = self.vlq
+        pairs = {}
+        stop = len(steps) if stop is None else stop
+        columns = zip(
+            steps.notes[start:stop], steps.velocities[start:stop],
+            steps.channels[start:stop], steps.rests[start:stop],
+        )
+        for note, velocity, channel, is_rest in columns:
+            if is_rest:
+                rest += step_ticks
+                continue
+            data += vlq(rest)
+            rest = 0
+            key = (note, velocity, channel)
+            pair = pairs.get(key)
+            if pair is None:
+                # The note_off always differs in status from the note_on
+                pair = pairs[key] = (
+                    bytes((0x90 | channel, note, velocity))
+                    + vlq(step_ticks)
+                    + bytes((0x80 | channel, note, 0))
+                )
+            if self._running == pair[0]:
+                data += pair[1:]
+            else:
+                data += pair
+            self._running = 0x80 | channel
+        return rest
+
+    def end_of_track(self, delta: int) -> None:
+        self.meta(delta, b"\xff\x2f\x00")
+
+    def take(self) -> bytes:
+        """Return and clear what has been encoded so far."""
+        chunk = bytes(self.data)
+        self.data.clear()
+        return chunk
+
+
 class StepSequenceFile:
     """
     Convenience wrapper that emits a single-track Standard MIDI File made of
@@ -98,7 +274,7 @@ class StepSequenceFile:
         self._step_length = step_length
         self._step_ticks = step_length.ticks(self._ticks_per_quarter)
         self._track_name = track_name
-        self._steps: List[StepEvent] = []
+        self._steps = StepBuffer()
         self._mid = MidiFile(type=0, ticks_per_beat=self._ticks_per_quarter)
 
     def add_step(self, event: StepEvent) -> None:
@@ -106,11 +282,15 @@ class StepSequenceFile:
         self._steps.append(event)
 
     def add_note(self, note: Note) -> None:
-        self.add_step(StepEvent.note(note.pitch_value(), velocity=note.velocity()))
+        self._steps.append_note(note.pitch_value(), note.velocity(), note.channel())
 
     def add_note_value(self, note: int, velocity: int = 96, channel: int = 0) -> None:
         """Convenience helper for adding note steps."""
-        self.add_step(StepEvent.note(note, velocity=velocity, channel=channel))
+        self._steps.append_note(note, velocity, channel)
+
+    def extend_steps(self, notes, velocities=None, channels=None, rests=None) -> None:
+        """Bulk-append steps from parallel columns; see StepBuffer.extend."""
+        self._steps.extend(notes, velocities, channels, rests)
 
     def add_note_name(
         self, note_name: str, velocity: int = 96, channel: int = 0
@@ -122,14 +302,13 @@ class StepSequenceFile:
 
     def add_rest(self) -> None:
         """Convenience helper for adding rest steps."""
-        self.add_step(StepEvent.rest())
+        self._steps.append_rest()
 
-    def _build_track(self) -> MidiTrack:
-        track = MidiTrack()
-        track.append(MetaMessage("track_name", name=self._track_name, time=0))
-        track.append(MetaMessage("text", text=f"random_seed = {getSeedMaster().seed}", time=0))
+    def _header_metas(self) -> list:
         numerator, denominator = self._time_signature
-        track.append(
+        return [
+            MetaMessage("track_name", name=self._track_name, time=0),
+            MetaMessage("text", text=f"random_seed = {getSeedMaster().seed}", time=0),
             MetaMessage(
                 "time_signature",
                 numerator=numerator,
@@ -137,21 +316,48 @@ class StepSequenceFile:
                 clocks_per_click=24,
                 notated_32nd_notes_per_beat=8,
                 time=0,
-            )
-        )
-        track.append(MetaMessage("set_tempo", tempo=bpm2tempo(self._bpm), time=0))
+            ),
+            MetaMessage("set_tempo", tempo=bpm2tempo(self._bpm), time=0),
+        ]
+
+    def _file_header(self) -> bytes:
+        return struct.pack(">4sLhhh", b"MThd", 6, self._mid.type, 1, self._ticks_per_quarter)
+
+    def _start_track(self) -> _SmfTrackEncoder:
+        encoder = _SmfTrackEncoder()
+        with meta_charset(self._mid.charset):
+            for meta in self._header_metas():
+                encoder.meta(meta.time, bytes(meta.bytes()))
+        return encoder
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode the Standard MIDI File directly, without building mido
+        messages.  Byte-for-byte identical to saving to_midifile().
+        """
+        encoder = self._start_track()
+        rest = encoder.steps(self._steps, self._step_ticks)
+        encoder.end_of_track(rest)
+        track = encoder.data
+        return self._file_header() + b"MTrk" + struct.pack(">L", len(track)) + track
+
+    def _build_track(self) -> MidiTrack:
+        track = MidiTrack(self._header_metas())
 
         accumulated_rest = 0
-        for event in self._steps:
-            if event.is_rest():
+        steps = self._steps
+        for note, velocity, channel, rest in zip(
+            steps.notes, steps.velocities, steps.channels, steps.rests
+        ):
+            if rest:
                 accumulated_rest += self._step_ticks
                 continue
             track.append(
                 Message(
                     "note_on",
-                    note=event.note,
-                    velocity=event.velocity,
-                    channel=event.channel,
+                    note=note,
+                    velocity=velocity,
+                    channel=channel,
                     time=accumulated_rest,
                 )
             )
@@ -159,9 +365,9 @@ class StepSequenceFile:
             track.append(
                 Message(
                     "note_off",
-                    note=event.note,
+                    note=note,
                     velocity=0,
-                    channel=event.channel,
+                    channel=channel,
                     time=self._step_ticks,
                 )
             )
@@ -171,10 +377,8 @@ class StepSequenceFile:
 
     def save(self, path: Path | str) -> Path:
         """Finalize the track and persist the Standard MIDI File."""
-        track = self._build_track()
-        self._mid.tracks = [track]
         destination = Path(path)
-        self._mid.save(destination.as_posix())
+        destination.write_bytes(self.to_bytes())
         return destination
 
     def to_midifile(self) -> MidiFile:
@@ -184,9 +388,102 @@ class StepSequenceFile:
         return self._mid
 
 
+class StepSequenceStream:
+    """
+    Writes a StepSequenceFile's Standard MIDI File to ``path`` while
+    steps are added.  Every ``chunk_steps`` steps the buffer is encoded,
+    appended to the file and cleared, so memory stays constant however
+    long the sequence gets.  close() writes the end of track and patches
+    the MTrk length into the header.
+
+    ``ssargs`` (bpm, time_signature, ...) are those of StepSequenceFile,
+    which supplies the file header and header metas; the bytes written
+    are the same as its to_bytes() for the same steps.
+    """
+
+    def __init__(self, path: Path | str, chunk_steps: int = 65536, **ssargs) -> None:
+        self._layout = StepSequenceFile(**ssargs)
+        self.path = Path(path)
+        self.step_count = 0
+        self._steps = StepBuffer()
+        self._step_ticks = self._layout._step_ticks
+        self._chunk_steps = chunk_steps
+        self._rest = 0
+        self._track_length = 0
+        self._fh = self.path.open("wb")
+        self._fh.write(self._layout._file_header())
+        self._fh.write(b"MTrk\x00\x00\x00\x00")
+        self._length_offset = self._fh.tell() - 4
+        self._encoder = self._layout._start_track()
+        self._write(self._encoder.take())
+
+    def _write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+        self._track_length += len(chunk)
+
+    def flush(self) -> None:
+        """Encode and write the buffered steps."""
+        steps = self._steps
+        if not len(steps):
+            return
+        self._rest = self._encoder.steps(steps, self._step_ticks, rest=self._rest)
+        self._write(self._encoder.take())
+        self.step_count += len(steps)
+        steps.clear()
+
+    def _check_flush(self) -> None:
+        if len(self._steps) >= self._chunk_steps:
+            self.flush()
+
+    def add_step(self, event: StepEvent) -> None:
+        self._steps.append(event)
+        self._check_flush()
+
+    def add_note(self, note: Note) -> None:
+        self._steps.append_note(note.pitch_value(), note.velocity(), note.channel())
+        self._check_flush()
+
+    def add_note_value(self, note: int, velocity: int = 96, channel: int = 0) -> None:
+        self._steps.append_note(note, velocity, channel)
+        self._check_flush()
+
+    def add_note_name(
+        self, note_name: str, velocity: int = 96, channel: int = 0
+    ) -> None:
+        self.add_step(
+            StepEvent.from_name(note_name, velocity=velocity, channel=channel)
+        )
+
+    def add_rest(self) -> None:
+        self._steps.append_rest()
+        self._check_flush()
+
+    def extend_steps(self, notes, velocities=None, channels=None, rests=None) -> None:
+        self._steps.extend(notes, velocities, channels, rests)
+        self._check_flush()
+
+    def close(self) -> Path:
+        if self._fh.closed:
+            return self.path
+        self.flush()
+        self._encoder.end_of_track(self._rest)
+        self._write(self._encoder.take())
+        self._fh.seek(self._length_offset)
+        self._fh.write(struct.pack(">L", self._track_length))
+        self._fh.close()
+        return self.path
+
+    def __enter__(self) -> "StepSequenceStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
 class GenerateStepSequencer:
 
     def __init__(self, generator, mods, **ssargs):
+        self._ssargs = ssargs
         self._stepseq = StepSequenceFile(**ssargs)
         if type(generator) != type([]):
             self._generators = []
@@ -198,17 +495,46 @@ class GenerateStepSequencer:
         self._mods = mods
 
     def generate_steps(self, nbr_steps):
+        return self._fill(self._stepseq, nbr_steps)
+
+    def stream_steps(self, path, nbr_steps, chunk_steps=65536):
+        """
+        Generate into a StepSequenceStream at ``path``, flushing every
+        ``chunk_steps`` steps, and close it.  Returns the path.
+        """
+        with StepSequenceStream(path, chunk_steps, **self._ssargs) as stream:
+            self._fill(stream, nbr_steps)
+        return stream.path
+
+    def _fill(self, stepseq, nbr_steps):
+        generators = [self._current_generator] + self._generators
+        if not self._mods and all(hasattr(g, "take_block") for g in generators):
+            return self._fill_blocks(stepseq, nbr_steps)
         for i in range(nbr_steps):
             note = next(self._current_generator)
             if note == None and len(self._generators):
                 self._current_generator = self._generators.pop()
                 note = next(self._current_generator)
             if note == None:
-                return self._stepseq
+                return stepseq
             for mod in self._mods:
                 note = mod.modulate(note)
-            self._stepseq.add_note(note)
-        return self._stepseq
+            stepseq.add_note(note)
+        return stepseq
+
+    def _fill_blocks(self, stepseq, nbr_steps, block_size=4096):
+        """Without modulators, take notes from the generators in blocks."""
+        remaining = nbr_steps
+        while remaining > 0:
+            wanted = min(remaining, block_size)
+            pitches, velocities, channels = self._current_generator.take_block(wanted)
+            stepseq.extend_steps(pitches, velocities, channels)
+            remaining -= len(pitches)
+            if len(pitches) < wanted:
+                if not self._generators:
+                    return stepseq
+                self._current_generator = self._generators.pop()
+        return stepseq
 
 
 
@@ -0,0 +1,88 @@
+"""
+Tempo estimation from MIDI clock arrival times
+"""
+
+
+class TempoTracker:
+    """
+    Alpha-beta (second-order PLL style) filter over clock arrival
+    timestamps in nanoseconds.
+
+    Each clock is compared with the predicted arrival; the residual
+    nudges the phase estimate by ``alpha`` and the tick period by
+    ``beta``.  A clock more than ``resync`` periods late (transport
+    paused, port stalled) or more than half a period early
+    resynchronises the phase without disturbing the period.  Two such
+    outliers in a row mean the period itself is wrong, e.g. a first
+    interval measured from two buffered clocks, so it is measured
+    again from the second one.
+    """
+
+    def __init__(self, ppqn=24, alpha=0.2, beta=0.02, resync=4.0):
+        self.ppqn = ppqn
+        self.alpha = alpha
+        self.beta = beta
+        self.resync = resync
+        self.reset()
+
+    def reset(self):
+        self._estimate = None
+        self._period = None
+        self._outlier = False
+        # Clocks coasted over before the period was known
+        self._coasted = 0
+        self.clock_count = 0
+
+    def clock(self, t_ns):
+        """Feed the arrival time of one clock message."""
+        self.clock_count += 1
+        if self._estimate is None:
+            self._estimate = t_ns
+            return
+        if self._period is None:
+            self._period = float(t_ns - self._estimate) / (self._coasted + 1)
+            self._coasted = 0
+            self._estimate = t_ns
+            return
+        predicted = self._estimate + self._period
+        residual = t_ns - predicted
+        if residual > self.resync * self._period or residual < -0.5 * self._period:
+            if self._outlier and t_ns > self._estimate:
+                self._period = float(t_ns - self._estimate)
+                self._outlier = False
+            else:
+                self._outlier = True
+            self._estimate = t_ns
+            return
+        self._outlier = False
+        self._estimate = predicted + self.alpha * residual
+        self._period += self.beta * residual
+
+    def coast(self, n):
+        """
+        Account for n clocks whose arrival times are unknown (drained
+        from a backed-up input) by assuming they arrived on time.
+        """
+        self.clock_count += n
+        if self._period is not None:
+            self._estimate += n * self._period
+        elif self._estimate is not None:
+            self._coasted += n
+
+    def locked(self):
+        return self._period is not None and self._period > 0
+
+    def period_ns(self):
+        return self._period
+
+    def bpm(self):
+        """Current tempo estimate, or None until two clocks have arrived."""
+        if not self.locked():
+            return None
+        return 60e9 / (self._period * self.ppqn)
+
+    def predict(self, ticks_ahead=1):
+        """Predicted monotonic time (ns) of the clock ``ticks_ahead`` from the last."""
+        if not self.locked():
+            return None
+        return self._estimate + ticks_ahead * self._period
@@ -0,0 +1,80 @@
+"""
+Compact clip-launch timelines rendered offline by ClipController
+"""
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+import mido
+
+from .clip_addressing import DEFAULT_ADDRESSING
+
+# MIDI clock resolution the controller runs at
+CLOCK_PPQN = 24
+
+
+class LaunchTimeline:
+    """
+    Launch plan as three parallel arrays: clock tick, track and scene.
+    Entries are appended in tick order.
+    """
+
+    def __init__(self):
+        self.ticks = array('l')
+        self.tracks = array('H')
+        self.scenes = array('H')
+
+    def append(self, tick, track, scene):
+        self.ticks.append(tick)
+        self.tracks.append(track)
+        self.scenes.append(scene)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __iter__(self):
+        return zip(self.ticks, self.tracks, self.scenes)
+
+    def window(self, start, end):
+        """Index range of the entries with start < tick <= end."""
+        return bisect_right(self.ticks, start), bisect_right(self.ticks, end)
+
+    def save(self, path):
+        """Write the raw arrays: entry count, then ticks, tracks and scenes."""
+        destination = Path(path)
+        with destination.open("wb") as fh:
+            array('Q', [len(self)]).tofile(fh)
+            self.ticks.tofile(fh)
+            self.tracks.tofile(fh)
+            self.scenes.tofile(fh)
+        return destination
+
+    @classmethod
+    def load(cls, path):
+        timeline = cls()
+        with Path(path).open("rb") as fh:
+            header = array('Q')
+            header.fromfile(fh, 1)
+            count = header[0]
+            timeline.ticks.fromfile(fh, count)
+            timeline.tracks.fromfile(fh, count)
+            timeline.scenes.fromfile(fh, count)
+        return timeline
+
+    def to_midifile(self, addressing=DEFAULT_ADDRESSING):
+        """Standard MIDI File of the launch messages at clock resolution."""
+        track = mido.MidiTrack()
+        last = 0
+        for tick, trk, scene in self:
+            msg = mido.Message.from_bytes(addressing.launch_bytes(trk, scene))
+            track.append(msg.copy(time=tick - last))
+            last = tick
+        track.append(mido.MetaMessage("end_of_track", time=0))
+        mid = mido.MidiFile(type=0, ticks_per_beat=CLOCK_PPQN)
+        mid.tracks.append(track)
+        return mid
+
+    def save_midi(self, path, addressing=DEFAULT_ADDRESSING):
+        destination = Path(path)
+        self.to_midifile(addressing).save(destination.as_posix())
+        return destination
@@ -0,0 +1,162 @@
+"""
+Hierarchical timing-wheel scheduler backend
+"""
+from typing import Dict, List
+
+from .event import DiscreteEventQueue
+
+
+class TimingWheelQueue(DiscreteEventQueue):
+    """
+    Drop-in replacement for the heap in DiscreteEventQueue, built from
+    three wheels at tick, beat and bar granularity plus an overflow map
+    for events further out than one revolution of the bar wheel.
+
+    An event is filed on the finest wheel that covers its firetime from
+    the current time: the tick wheel holds the current beat, the beat
+    wheel the rest of the current bar and the bar wheel the rest of the
+    current revolution.  On each beat, bar and revolution boundary the
+    matching coarse slot is cascaded down, so each event is moved at
+    most three times and insert and expire are amortized O(1).  Firing
+    order (firetime, priority, insertion) matches the heap.
+    """
+
+    def __init__(self, ticks_per_beat=24, beats_per_bar=4, bars=64, **queue_args):
+        super().__init__(**queue_args)
+        self._sizes = (ticks_per_beat, beats_per_bar, bars)
+        self._spans = (ticks_per_beat,
+                       ticks_per_beat * beats_per_bar,
+                       ticks_per_beat * beats_per_bar * bars)
+        self._beat, self._bar, self._rev = self._spans
+        self._wheels : List = [[[] for _ in range(size)] for size in self._sizes]
+        self._counts : List = [0, 0, 0]
+        self._overflow : Dict = {}
+        self._late : List = []
+        self._live : int = 0
+
+    def _place(self, entry):
+        firetime = entry[0]
+        now = self._current_time
+        beat = self._beat
+        if firetime // beat == now // beat:
+            self._wheels[0][firetime % beat].append(entry)
+            self._counts[0] += 1
+            return
+        bar = self._bar
+        if firetime // bar == now // bar:
+            self._wheels[1][(firetime // beat) % self._sizes[1]].append(entry)
+            self._counts[1] += 1
+            return
+        rev = self._rev
+        if firetime // rev == now // rev:
+            self._wheels[2][(firetime // bar) % self._sizes[2]].append(entry)
+            self._counts[2] += 1
+            return
+        self._overflow.setdefault(firetime // rev, []).append(entry)
+
+    def _cascade(self, level, slot):
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = []
+        self._counts[level] -= len(bucket)
+        for entry in bucket:
+            if entry[3] is not None:
+                self._place(entry)
+
+    def add(self, event, priority=0):
+        entry = [event.firetime(), priority, next(self._seq), event]
+        self._entries[event] = entry
+        self._live += 1
+        if entry[0] <= self._current_time:
+            # Already due: fires on the next tick, as with the heap
+            self._late.append(entry)
+        else:
+            self._place(entry)
+
+    def add_many(self, events, priority=0):
+        for event in events:
+            self.add(event, priority)
+
+    def cancel(self, event):
+        entry = self._entries.pop(event, None)
+        if entry is None:
+            return False
+        entry[3] = None
+        self._live -= 1
+        return True
+
+    def pending(self):
+        return self._live
+
+    def _advance(self, n):
+        beat, bar, rev = self._spans
+        end = self._current_time + n
+        due = self._late
+        self._late = []
+        t = self._current_time
+        while t < end:
+            # Skip straight to the next boundary that can hold work
+            if self._counts[0]:
+                t += 1
+            elif self._counts[1]:
+                t = min(end, (t // beat + 1) * beat)
+            elif self._counts[2]:
+                t = min(end, (t // bar + 1) * bar)
+            elif self._overflow:
+                t = min(end, (t // rev + 1) * rev)
+            else:
+                t = end
+            self._current_time = t
+            if t % beat == 0:
+                if t % bar == 0:
+                    if t % rev == 0:
+                        for entry in self._overflow.pop(t // rev, ()):
+                            if entry[3] is not None:
+                                self._place(entry)
+                    self._cascade(2, (t // bar) % self._sizes[2])
+                self._cascade(1, (t // beat) % self._sizes[1])
+            slot = t % beat
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = []
+                self._counts[0] -= len(bucket)
+                due.extend(bucket)
+        self._current_time = end
+        due.sort()
+        current_events = []
+        for entry in due:
+            event = entry[3]
+            if event is None:
+                continue
+            if self._entries.get(event) is entry:
+                del self._entries[event]
+            self._live -= 1
+            current_events.append(event)
+        return current_events
+
+    def next_firetime(self):
+        live = [e[0] for e in self._late if e[3] is not None]
+        if live:
+            return min(live)
+        now = self._current_time
+        beat, bar, rev = self._spans
+        if self._counts[0]:
+            wheel = self._wheels[0]
+            for t in range(now + 1, (now // beat + 1) * beat):
+                if any(e[3] is not None for e in wheel[t % beat]):
+                    return t
+        for level, span in ((1, beat), (2, bar)):
+            if not self._counts[level]:
+                continue
+            wheel = self._wheels[level]
+            size = self._sizes[level]
+            for slot in range(now // span % size + 1, size):
+                live = [e[0] for e in wheel[slot] if e[3] is not None]
+                if live:
+                    return min(live)
+        for key in sorted(self._overflow):
+            live = [e[0] for e in self._overflow[key] if e[3] is not None]
+            if live:
+                return min(live)
+        return None
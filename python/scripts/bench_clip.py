@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""End-to-end ClipController load benchmark against a simulated clock."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.clock_record import ReplayAgent
+from phinrip.event import DiscreteEventQueue
+from phinrip.metrics import Instrumentation
+from phinrip.sim_agent import SimulatedClockAgent
+from phinrip.timing_wheel import TimingWheelQueue
+
+BACKENDS = {
+    "heap": DiscreteEventQueue,
+    "wheel": TimingWheelQueue,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--updates", type=int, default=1000, help="Controller updates (bars) to run.")
+    parser.add_argument("--bpm", type=float, default=120.0)
+    parser.add_argument("--jitter-us", type=float, default=0.0, help="Gaussian clock jitter (std dev, us).")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Pace the clock at --bpm instead of running at max speed.",
+    )
+    parser.add_argument("--replay", type=Path, help="Drive the clock from a recording (scripts/record_clock.py).")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="heap")
+    parser.add_argument("--lookahead", type=int, default=0, help="Pre-generate this many updates ahead.")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.replay:
+        agent = ReplayAgent(args.replay, realtime=args.realtime)
+    else:
+        agent = SimulatedClockAgent(
+            bpm=args.bpm,
+            jitter_ns=args.jitter_us * 1e3,
+            max_speed=not args.realtime,
+            seed=args.seed,
+        )
+    metrics = Instrumentation()
+    controller = ClipController(
+        RandomClipGenerator(),
+        agent=agent,
+        queue_cls=BACKENDS[args.backend],
+        lookahead=args.lookahead,
+        metrics=metrics,
+    )
+    start = time.perf_counter()
+    controller.runFor(args.updates)
+    elapsed = time.perf_counter() - start
+
+    ticks = controller.sync_queue().current_time()
+    print(
+        f"{ticks} ticks, {len(agent.sent)} launches in {elapsed:.3f} s "
+        f"({ticks / elapsed:,.0f} ticks/s); "
+        f"tempo estimate {controller.sync_queue().bpm():.2f} bpm, "
+        f"{controller.deadline_misses()} deadline misses"
+    )
+    metrics.dump(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
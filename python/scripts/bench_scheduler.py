@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare the heap and timing-wheel event queue backends."""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phinrip.event import DiscreteEventQueue, Event
+from phinrip.timing_wheel import TimingWheelQueue
+
+BACKENDS = {
+    "heap": DiscreteEventQueue,
+    "wheel": TimingWheelQueue,
+}
+
+
+class RepeatEvent(Event):
+    """Reschedules a fresh copy of itself up to four bars ahead."""
+
+    def __init__(self, queue, firetime, delays):
+        super().__init__(firetime)
+        self._queue = queue
+        self._delays = delays
+
+    def _fire_event(self):
+        # Delays are drawn up front so the RNG stays out of the measurement
+        delay = next(self._delays)
+        self._queue.add(RepeatEvent(self._queue, self.firetime() + delay, self._delays))
+        return False
+
+
+def run(queue_cls, pending: int, ticks: int, seed: int) -> tuple[float, float, int]:
+    rng = random.Random(seed)
+    queue = queue_cls()
+    delays = itertools.cycle([rng.randint(1, 24 * 4 * 4) for _ in range(65537)])
+    events = [RepeatEvent(queue, next(delays), delays) for _ in range(pending)]
+    start = time.perf_counter()
+    for event in events:
+        queue.add(event)
+    fill = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        queue.tick()
+    elapsed = time.perf_counter() - start
+    return fill, elapsed, len(queue.event_log())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--pending",
+        type=int,
+        action="append",
+        help="Steady-state pending event count; repeatable (default: 10000 and 100000).",
+    )
+    parser.add_argument("--ticks", type=int, default=24 * 4 * 8, help="Clock ticks to run.")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for pending in args.pending or [10_000, 100_000]:
+        for name, queue_cls in BACKENDS.items():
+            fill, elapsed, fired = run(queue_cls, pending, args.ticks, args.seed)
+            print(
+                f"{name:>5} pending={pending:>7}  fill {fill * 1e3:8.1f} ms  "
+                f"{fired:>8} events in {elapsed:6.2f} s  "
+                f"({elapsed / fired * 1e6:5.2f} us/event)"
+            )
+
+
+if __name__ == "__main__":
+    main()
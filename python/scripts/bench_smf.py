@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Compare the direct SMF encoder with building and saving mido messages."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phinrip.step_sequence import StepSequenceFile
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--steps", type=int, default=1_000_000)
+    parser.add_argument("--rest-ratio", type=float, default=0.1, help="Fraction of steps that are rests.")
+    parser.add_argument("--skip-mido", action="store_true", help="Only time the direct encoder.")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    file = StepSequenceFile()
+    file.extend_steps(
+        array("B", (rng.randrange(36, 96) for _ in range(args.steps))),
+        velocities=array("B", (rng.randrange(40, 127) for _ in range(args.steps))),
+        rests=array("B", (rng.random() < args.rest_ratio for _ in range(args.steps))),
+    )
+
+    start = time.perf_counter()
+    direct = file.to_bytes()
+    direct_s = time.perf_counter() - start
+    print(f"direct: {direct_s:.3f} s, {len(direct):,} bytes ({args.steps / direct_s:,.0f} steps/s)")
+    if args.skip_mido:
+        return
+
+    start = time.perf_counter()
+    buf = io.BytesIO()
+    file.to_midifile().save(file=buf)
+    mido_s = time.perf_counter() - start
+    print(f"mido:   {mido_s:.3f} s ({args.steps / mido_s:,.0f} steps/s)")
+    print(f"speedup {mido_s / direct_s:.1f}x, identical output: {buf.getvalue() == direct}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Train a MarkovSequence JSON spec from a directory of MIDI files."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phinrip.markov_train import MarkovTrainer
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Count note transitions in a MIDI corpus and write a sequence-gen JSON file."
+    )
+    parser.add_argument("corpus", type=Path, help="Directory searched for .mid files.")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Destination JSON file.")
+    parser.add_argument("--order", type=int, default=1, help="Markov order (context length).")
+    parser.add_argument(
+        "--channel",
+        type=int,
+        action="append",
+        help="MIDI channel (0-15) to train on; repeatable. Defaults to all but drums.",
+    )
+    parser.add_argument("-j", "--processes", type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument(
+        "--wrap",
+        action="store_true",
+        help="Also count a transition from the last note of each line back to the first.",
+    )
+    parser.add_argument("--min-count", type=int, default=1, help="Drop rarer transitions.")
+    parser.add_argument("--notecount", type=int, default=256, help="notecount for the generated spec.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    corpus = args.corpus.expanduser()
+    if not corpus.is_dir():
+        raise SystemExit(f"Corpus directory not found: {corpus}")
+
+    trainer = MarkovTrainer(order=args.order, channels=args.channel, wrap=args.wrap)
+    start = time.perf_counter()
+    trainer.add_directory(corpus, processes=args.processes)
+    trainer.save_json(args.output, notecount=args.notecount, min_count=args.min_count)
+
+    for path, error in trainer.skipped:
+        print(f"[markov_train] skipped {path}: {error}", file=sys.stderr)
+
+    if args.verbose:
+        print(
+            f"[markov_train] {trainer.file_count} files ({len(trainer.skipped)} skipped), "
+            f"{len(trainer.counts)} transitions "
+            f"in {time.perf_counter() - start:.2f}s -> {args.output}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
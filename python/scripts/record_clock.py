@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Record MIDI clock from an input port for replay with ReplayAgent."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from phinrip.clock_record import RecordingAgent
+from phinrip.midi_queue import MidiAgent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("port", help="MIDI input port name.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("clock.bin"))
+    parser.add_argument("-n", "--ticks", type=int, default=24 * 4 * 64, help="Clock ticks to record.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    agent = MidiAgent(in_str=args.port)
+    agent.open_ports()
+    recorder = RecordingAgent(agent, args.output)
+    ticks = 0
+    try:
+        while ticks < args.ticks:
+            if recorder.blocking_listen().type == "clock":
+                ticks += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    print(f"Recorded {ticks} ticks to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
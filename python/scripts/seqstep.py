@@ -43,6 +43,17 @@ def parse_args() -> argparse.Namespace:
         type=int,
         help="Optional phrandom seed to reproduce a sequence exactly.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write steps to the output file in chunks as they are generated (constant memory).",
+    )
+    parser.add_argument(
+        "--chunk-steps",
+        type=int,
+        default=65536,
+        help="Steps buffered between writes with --stream.",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -99,9 +110,12 @@ def main() -> None:
             file=sys.stderr,
         )
 
-    step_sequence = sequencer.generate_steps(steps)
     output_path = resolve_output_path(config_path, args.output)
-    saved_path = step_sequence.save(output_path)
+    if args.stream:
+        saved_path = sequencer.stream_steps(output_path, steps, chunk_steps=args.chunk_steps)
+    else:
+        step_sequence = sequencer.generate_steps(steps)
+        saved_path = step_sequence.save(output_path)
 
     if args.verbose:
         print(f"[seqstep] Wrote MIDI file to {saved_path}", file=sys.stderr)
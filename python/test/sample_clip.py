@@ -1,6 +1,7 @@
 
 import pytest
 import sys, os, pprint
+import mido
 
 sys.path.append(os.getcwd())
 
@@ -17,7 +18,7 @@ class StubAgent:
         self.msg_log.append(msg)
 
     def blocking_listen(self):
-        return object()
+        return mido.Message('clock')
         
 
 if __name__ == '__main__':
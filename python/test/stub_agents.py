@@ -0,0 +1,35 @@
+import mido
+
+
+class StubAgent:
+
+    def __init__(self):
+        self.msg_log = []
+
+    def send(self, msg):
+        self.msg_log.append(msg)
+
+    def blocking_listen(self):
+        return mido.Message('clock')
+
+
+class BurstAgent:
+    """Every fourth clock arrives with three more already waiting."""
+    def __init__(self, clocks):
+        self.clocks = clocks
+        self.now = 0
+        self.backlog = []
+    def blocking_listen(self):
+        if self.clocks <= 0:
+            return None
+        self.clocks -= 4
+        self.now += 4 * 20833333
+        self.backlog = [mido.Message('clock')] * 3
+        return mido.Message('clock')
+    def pending(self):
+        backlog, self.backlog = self.backlog, []
+        return backlog
+    def now_ns(self):
+        return self.now
+    def send_raw(self, data):
+        pass
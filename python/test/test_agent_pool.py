@@ -0,0 +1,50 @@
+import pytest
+import sys, os
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.agent_pool import MidiAgentPool, SyncFanout
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.metrics import Instrumentation
+from phinrip.midi_queue import ExternalSyncQueue
+from phinrip.sim_agent import SimulatedClockAgent
+from stub_agents import StubAgent, BurstAgent
+
+
+class FakePort:
+    def __init__(self, name):
+        self.name = name
+        self.sent = []
+    def send(self, msg):
+        self.sent.append(msg)
+
+def test_agent_pool_fanout(monkeypatch):
+    ports = {}
+    monkeypatch.setattr(mido, 'open_output',
+                        lambda name: ports.setdefault(name, FakePort(name)))
+    pool = MidiAgentPool({'live': 'Port A', 'bitwig': 'Port B'})
+    pool.open_ports()
+    clock = SimulatedClockAgent(max_speed=True)
+    fanout = SyncFanout(clock)
+    controllers = [ClipController(RandomClipGenerator(), agent=pool.agent_for(dest))
+                   for dest in ('live', 'bitwig')]
+    fanout.run_controllers(controllers, 4)
+    pool.close()
+    assert len(ports['Port A'].sent) == 4
+    assert len(ports['Port B'].sent) == 4
+    assert pool.stats()['bitwig']['sent'] == 4
+    # One listen per clock, stopping at the last update
+    assert clock.ticks_sent == 4 * 96 + 1
+
+def test_fanout_catch_up_and_metrics():
+    fanout = SyncFanout(BurstAgent(40))
+    queues = [ExternalSyncQueue(StubAgent(), metrics=Instrumentation(), catch_up=True)
+              for _ in range(2)]
+    for q in queues:
+        fanout.attach(q)
+    fanout.run()
+    for q in queues:
+        assert q.current_time() == 40
+        assert q.deadline_misses == 30
+        assert q.metrics.snapshot()['tick']['count'] == 10
@@ -0,0 +1,96 @@
+import pytest
+import sys, os
+import asyncio
+
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.async_queue import AsyncMidiAgent, AsyncExternalSyncQueue
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+
+PERIOD = 60e9 / (120 * 24)
+
+
+class TimedAgent(AsyncMidiAgent):
+    """Clock arrival times advance one 120 bpm period per delivery."""
+    def __init__(self):
+        super().__init__()
+        self.deliveries = 0
+
+    def now_ns(self):
+        self.deliveries += 1
+        return int(self.deliveries * PERIOD)
+
+
+class StubAsyncAgent(AsyncMidiAgent):
+    def __init__(self):
+        super().__init__()
+        self.msg_log = []
+
+    def send(self, msg):
+        self.msg_log.append(msg)
+
+    def send_raw(self, data):
+        self.msg_log.append(data)
+
+
+def test_queues_share_arrival_timestamps():
+    async def main():
+        agent = TimedAgent()
+        queues = [AsyncExternalSyncQueue(agent) for _ in range(3)]
+        runs = [asyncio.create_task(q.run()) for q in queues]
+        await asyncio.sleep(0)
+        # Deliver in bursts, so the queues get to each clock late
+        for _ in range(10):
+            for _ in range(12):
+                agent.deliver(mido.Message('clock'))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for q in queues:
+            q.stop()
+        await asyncio.gather(*runs)
+        return queues
+
+    queues = asyncio.run(main())
+    for q in queues:
+        assert q.bpm() == pytest.approx(120)
+        assert q.predicted_next_tick() == pytest.approx(121 * PERIOD)
+
+def test_stop_without_more_input():
+    async def main():
+        agent = TimedAgent()
+        q = AsyncExternalSyncQueue(agent)
+        run = asyncio.create_task(q.run())
+        await asyncio.sleep(0)
+        for _ in range(4):
+            agent.deliver(mido.Message('clock'))
+        # The DAW stops its transport and sends no more clock
+        agent.deliver(mido.Message('stop'))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        q.stop()
+        await asyncio.wait_for(run, 1)
+        return q, agent
+
+    q, agent = asyncio.run(main())
+    assert q.current_time() == 4
+    assert not q.is_running()
+    assert agent._subscribers == []
+
+def test_async_controllers_share_agent():
+    async def main():
+        agent = StubAsyncAgent()
+        controllers = [ClipController(RandomClipGenerator(), agent=agent,
+                                      sync_cls=AsyncExternalSyncQueue)
+                       for _ in range(3)]
+        runs = [asyncio.create_task(cc.runForAsync(4)) for cc in controllers]
+        await asyncio.sleep(0)
+        clock = mido.Message('clock')
+        while not all(r.done() for r in runs):
+            agent.deliver(clock)
+            await asyncio.sleep(0)
+        return agent
+
+    agent = asyncio.run(main())
+    assert len(agent.msg_log) == 3 * 4
@@ -1,25 +1,82 @@
 import pytest
 import sys, os
+import time
+import mido
 
 sys.path.append(os.getcwd())
 
-from phinrip.clip_controller import ClipController, Clip, RandomClipGenerator
+from phinrip.clip_addressing import NoteAddressing
+from phinrip.clip_controller import (ClipController, Clip, RandomClipGenerator,
+                                     LookaheadGenerator, TRACK_COUNT, SCENE_COUNT)
+from stub_agents import StubAgent
 
 
-class StubAgent:
-
-    def __init__(self):
-        self.msg_log = []
-
-    def send(self, msg):
-        self.msg_log.append(msg)
-
-    def blocking_listen(self):
-        return object()
-        
 def test_clip_controller():
     cc = ClipController(RandomClipGenerator(),
                         StubAgent)
 
     cc.runFor(10)
     assert len(cc._agent.msg_log) == 10, "Did not generate msgs"
+
+class SlowGenerator(RandomClipGenerator):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def generate(self, firetime, controller):
+        time.sleep(self.delay)
+        return super().generate(firetime, controller)
+
+class PacedAgent(StubAgent):
+    def blocking_listen(self):
+        time.sleep(0.0002)
+        return super().blocking_listen()
+
+def test_lookahead_controller():
+    cc = ClipController(SlowGenerator(0.001), PacedAgent, lookahead=4)
+    cc.runFor(10)
+    assert len(cc._agent.msg_log) == 10
+    assert cc.deadline_misses() == 0
+    launches = [e.firetime() for e in cc.event_log() if e.payload_ids()]
+    assert launches == [1 + 10 + 96 * i for i in range(10)]
+
+    gen = LookaheadGenerator(SlowGenerator(0.05), depth=1, on_miss='skip')
+    gen.start(1, 96, cc)
+    gen.generate(1, cc)
+    assert gen.generate(97, cc) == []
+    assert gen.deadline_misses == 1
+    time.sleep(0.15)
+    events = gen.generate(193, cc)
+    gen.stop()
+    assert [e.firetime() for e in events] == [203]
+
+def test_launch_table_matches_messages():
+    for t in range(TRACK_COUNT):
+        for s in range(SCENE_COUNT):
+            clip = Clip(t, s)
+            # The default 8x8 grid keeps the original note numbering
+            expected = mido.Message('note_on', note=t * SCENE_COUNT + s + 10)
+            assert clip.constructMidiMessage() == expected
+            assert clip.midi_bytes() == bytes(expected.bytes())
+    banked = NoteAddressing(16, 8)
+    assert Clip(15, 7).constructMidiMessage(banked).channel == 1
+    with pytest.raises(ValueError):
+        Clip(15, 7).constructMidiMessage()
+
+def test_lookahead_generator_failure():
+    class FailingGenerator(RandomClipGenerator):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def generate(self, firetime, controller):
+            self.calls += 1
+            if self.calls == 7:
+                raise KeyError("no clip")
+            return super().generate(firetime, controller)
+
+    cc = ClipController(FailingGenerator(), StubAgent, lookahead=2)
+    with pytest.raises(KeyError):
+        cc.runFor(20)
+    # Everything generated before the failure was still launched
+    assert len(cc._agent.msg_log) == 6
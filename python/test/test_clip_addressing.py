@@ -0,0 +1,33 @@
+import pytest
+import sys, os
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_addressing import NoteAddressing, TrackChannelAddressing, CCAddressing
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.sim_agent import SimulatedClockAgent
+
+
+def test_banked_addressing():
+    for addressing in (NoteAddressing(64, 16), TrackChannelAddressing(64, 16),
+                       CCAddressing(64, 16)):
+        table = {addressing.launch_bytes(t, s) for t in range(64) for s in range(16)}
+        assert len(table) == 64 * 16
+        for data in table:
+            msg = mido.Message.from_bytes(data)
+            assert msg.type in ('note_on', 'control_change')
+    assert NoteAddressing(64, 16).launch_bytes(7, 5) == bytes((0x90, 127, 64))
+    assert NoteAddressing(64, 16).launch_bytes(8, 5) == bytes((0x91, 10 + 8 * 16 + 5 - 118, 64))
+    with pytest.raises(ValueError):
+        NoteAddressing(200, 16)
+    with pytest.raises(ValueError):
+        NoteAddressing().launch_bytes(8, 0)
+
+def test_launch_scene_batch():
+    agent = SimulatedClockAgent(max_speed=True)
+    cc = ClipController(RandomClipGenerator(), agent=agent,
+                        addressing=TrackChannelAddressing(32, 8))
+    cc.launchScene(3)
+    assert [data for _, data in agent.sent] == list(cc._addressing.scene_row(3))
+    assert len(agent.sent) == 32
@@ -0,0 +1,48 @@
+import pytest
+import sys, os
+import random
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.clock_record import RecordingAgent, ReplayAgent, read_clock_log
+from phinrip.sim_agent import SimulatedClockAgent
+from stub_agents import BurstAgent
+
+
+def test_record_and_replay_clock(tmp_path):
+    path = tmp_path / "clock.bin"
+    source = SimulatedClockAgent(bpm=128, jitter_ns=800000, max_speed=True, seed=11)
+    # Small capacity so the map is grown while recording
+    recorder = RecordingAgent(source, path, capacity=100)
+    random.seed(3)
+    cc = ClipController(RandomClipGenerator(), agent=recorder)
+    cc.runFor(5)
+    recorder.close()
+    records = read_clock_log(path)
+    assert len(records) == 5 * 96 + 2
+    assert records[0][1] == bytes((0xFA,))
+    assert path.stat().st_size == 8 + 12 * len(records)
+
+    replay = ReplayAgent(path)
+    random.seed(3)
+    again = ClipController(RandomClipGenerator(), agent=replay)
+    again.runFor(5)
+    assert replay.sent == [(ts, data) for ts, data in source.sent]
+    assert again._queue.bpm() == cc._queue.bpm()
+    assert replay.blocking_listen() is None
+
+def test_record_and_replay_catch_up(tmp_path):
+    path = tmp_path / "burst.bin"
+    recorder = RecordingAgent(BurstAgent(400), path)
+    cc = ClipController(RandomClipGenerator(), agent=recorder, catch_up=True)
+    cc.runFor(3)
+    recorder.close()
+    assert len(read_clock_log(path)) == cc._queue.current_time() == 289
+
+    replay = ReplayAgent(path)
+    again = ClipController(RandomClipGenerator(), agent=replay, catch_up=True)
+    again.runFor(3)
+    assert again._queue.current_time() == 289
+    assert again.late_clocks() == cc.late_clocks() == 72 * 3
+    assert again._queue.bpm() == cc._queue.bpm()
@@ -1,9 +1,15 @@
 import pytest
 import sys, os
+import json
+import random
+import struct
+import threading
 
 sys.path.append(os.getcwd())
 
 from phinrip.event import DiscreteEventQueue, Event
+from phinrip.event_log import JsonlEventSink, BinaryEventSink, read_binary_log
+from phinrip.timing_wheel import TimingWheelQueue
 
 def test_eventq():
     q = DiscreteEventQueue()
@@ -28,3 +34,190 @@ def test_queue_process():
     assert q.event_log()[0].firetime() == 1
     # Ensure all events were processed
     assert len(q.event_log()) == 3
+
+class ChainEvent(Event):
+    """Reschedules itself every `step` ticks and records when it fired."""
+    def __init__(self, queue, firetime, step, fired):
+        super().__init__(firetime)
+        self._queue = queue
+        self._step = step
+        self._fired = fired
+
+    def _fire_event(self):
+        self._fired.append((self._queue.current_time(), self.firetime(), self._step))
+        self._queue.add(ChainEvent(self._queue, self.firetime() + self._step,
+                                   self._step, self._fired))
+        # Already due, so it fires on the next tick
+        if self._step == 96:
+            self._queue.add(ChainEvent(self._queue, self.firetime() - 1,
+                                       1000000, self._fired))
+        return False
+
+def run_chain(advance, queue_cls=DiscreteEventQueue):
+    fired = []
+    q = queue_cls()
+    q.add(ChainEvent(q, 1, 96, fired))
+    q.add(ChainEvent(q, 50, 24 * 7, fired))
+    advance(q)
+    return q, fired
+
+def test_run_until_matches_ticking():
+    def step(q):
+        for _ in range(5000):
+            q.tick()
+    q1, stepped = run_chain(step)
+    q2, jumped = run_chain(lambda q: q.run_until(5000))
+    assert stepped == jumped
+    assert q1.current_time() == q2.current_time() == 5000
+    assert [e.firetime() for e in q1.event_log()] == [e.firetime() for e in q2.event_log()]
+
+def test_advance_to_next_event():
+    q = DiscreteEventQueue()
+    assert q.advance_to_next_event() is None
+    q.add(Event(40))
+    assert q.advance_to_next_event(limit=39) is None
+    assert q.advance_to_next_event() == 40
+    assert len(q.event_log()) == 1
+
+def test_same_firetime_order():
+    q = DiscreteEventQueue()
+    first, second, urgent = Event(5), Event(5), Event(5)
+    q.add(first)
+    q.add(second)
+    q.add(urgent, priority=-1)
+    q.tick(5)
+    assert list(q.event_log()) == [urgent, first, second]
+
+def test_add_many_cancel_reschedule():
+    q = DiscreteEventQueue()
+    events = [Event(t % 7 + 1) for t in range(100)]
+    q.add_many(events)
+    assert q.pending() == 100
+    assert q.cancel(events[0])
+    assert not q.cancel(events[0])
+    q.reschedule(events[1], 20)
+    assert q.pending() == 99
+    q.tick(7)
+    assert len(q.event_log()) == 98
+    assert events[0] not in q.event_log()
+    # Stable order within each firetime
+    log = q.event_log()
+    assert all(log[i].firetime() <= log[i + 1].firetime() for i in range(97))
+    assert q.next_firetime() == 20
+    q.run_until(20)
+    assert q.event_log()[-1] is events[1]
+
+@pytest.mark.parametrize("jump", [False, True])
+def test_timing_wheel_matches_heap(jump):
+    def step(q):
+        for _ in range(20000):
+            q.tick()
+    advance = (lambda q: q.run_until(20000)) if jump else step
+    _, heap_fired = run_chain(step)
+    wheel, wheel_fired = run_chain(advance, TimingWheelQueue)
+    assert wheel_fired == heap_fired
+    assert wheel.current_time() == 20000
+
+def test_timing_wheel_far_events():
+    rng = random.Random(7)
+    heap, wheel = DiscreteEventQueue(), TimingWheelQueue(bars=4)
+    events = [Event(rng.randint(1, 5000)) for _ in range(2000)]
+    priorities = [rng.randint(0, 2) for _ in events]
+    for q in (heap, wheel):
+        q.add_many(events[:1000])
+        for e, p in zip(events[1000:], priorities):
+            q.add(e, priority=p)
+        for e in events[::10]:
+            q.cancel(e)
+        q.reschedule(events[5], 4000)
+    assert wheel.pending() == heap.pending()
+    while True:
+        t = heap.next_firetime()
+        assert wheel.next_firetime() == t
+        if t is None:
+            break
+        heap.tick(t - heap.current_time() + rng.randint(0, 3))
+        wheel.tick(heap.current_time() - wheel.current_time())
+        assert list(wheel.event_log()) == list(heap.event_log())
+
+def test_bounded_log_and_sinks(tmp_path):
+    jsonl = JsonlEventSink(tmp_path / "log.jsonl")
+    binary = BinaryEventSink(tmp_path / "log.bin")
+    q = DiscreteEventQueue(log_size=5, sinks=[jsonl])
+    q.add_sink(binary)
+    q.add_many(Event(t) for t in range(1, 21))
+    q.run_until(30)
+    q.close()
+    assert [e.firetime() for e in q.event_log()] == [16, 17, 18, 19, 20]
+    lines = (tmp_path / "log.jsonl").read_text().splitlines()
+    assert [json.loads(l)["firetime"] for l in lines] == list(range(1, 21))
+    records = list(read_binary_log(tmp_path / "log.bin"))
+    assert records == [(t, "Event", ()) for t in range(1, 21)]
+
+class KeyedEvent(Event):
+    def __init__(self, firetime, key, may_drop=True):
+        super().__init__(firetime)
+        self._key = key
+        self.may_drop = may_drop
+
+    def payload_ids(self):
+        return (self._key,)
+
+@pytest.mark.parametrize("queue_cls", [DiscreteEventQueue, TimingWheelQueue])
+@pytest.mark.parametrize("policy,fired,dropped", [
+    ('late', [1, 2, 3, 4, 6], 0),
+    ('drop', [3, 6], 3),
+    ('collapse', [2, 3, 4, 6], 1),
+])
+def test_catch_up_stale_policy(queue_cls, policy, fired, dropped):
+    q = queue_cls(stale_policy=policy)
+    q.add_many([KeyedEvent(1, 'a'), KeyedEvent(2, 'a'), KeyedEvent(3, 'a', may_drop=False),
+                KeyedEvent(4, 'b'), KeyedEvent(6, 'a'), KeyedEvent(7, 'a')])
+    q.catch_up(6)
+    assert [e.firetime() for e in q.event_log()] == fired
+    assert q.stale_events == 4
+    assert q.dropped_events == dropped
+    q.catch_up(1)
+    assert q.event_log()[-1].firetime() == 7
+    assert q.stale_events == 4
+
+def test_unknown_stale_policy():
+    with pytest.raises(ValueError):
+        DiscreteEventQueue(stale_policy='skip')
+
+def test_stalled_sink_drops(tmp_path):
+    class StalledSink(JsonlEventSink):
+        gate = threading.Event()
+
+        def _write_event(self, fh, event):
+            self.gate.wait()
+            super()._write_event(fh, event)
+
+    sink = StalledSink(tmp_path / "log.jsonl", maxsize=4)
+    sink.write_many(Event(t) for t in range(10))
+    # Four wait and at most one is already with the writer
+    assert sink.dropped in (5, 6)
+    StalledSink.gate.set()
+    sink.close()
+    assert sink.written + sink.dropped == 10
+
+def test_sink_skips_bad_records(tmp_path):
+    class Payload(Event):
+        def __init__(self, firetime, ids):
+            super().__init__(firetime)
+            self.ids = ids
+
+        def payload_ids(self):
+            return self.ids
+
+    binary = BinaryEventSink(tmp_path / "log.bin")
+    binary.write_many([Payload(1, [3]), Payload(2, [1 << 40]), Payload(3, [4])])
+    binary.close()
+    assert (binary.written, binary.failed) == (2, 1)
+    assert isinstance(binary.last_error, struct.error)
+    assert [r[0] for r in read_binary_log(tmp_path / "log.bin")] == [1, 3]
+
+    missing = JsonlEventSink(tmp_path / "no_such_dir" / "log.jsonl")
+    missing.write(Event(1))
+    with pytest.raises(FileNotFoundError):
+        missing.close()
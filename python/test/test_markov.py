@@ -0,0 +1,130 @@
+import pytest
+import sys, os
+
+sys.path.append(os.getcwd())
+
+import phinrip.markov as pmark
+import phinrip.note_generator as pgen
+
+
+def make_chain():
+    a = pmark.MarkovNode()
+    a.label = 'a'
+    b = pmark.MarkovNode()
+    b.label = 'b'
+    c = pmark.MarkovNode()
+    c.label = 'c'
+    a.add_transition(b, 6)
+    a.add_transition(c, 4)
+    b.add_transition(c, 8)
+    b.add_transition(a, 2)
+    c.add_transition(a, 9)
+    c.add_transition(b, 1)
+    proc = pmark.MarkovProcess()
+    for n in (a, b, c):
+        proc.add_node(n)
+    proc.current_node = a
+    return proc
+
+def test_alias_distribution():
+    node = pmark.MarkovNode()
+    targets = [pmark.MarkovNode() for _ in range(4)]
+    for i, t in enumerate(targets):
+        t.label = i
+        node.add_transition(t, i + 1)
+    node.freeze()
+    assert node.is_frozen()
+    counts = [0] * 4
+    for _ in range(20000):
+        counts[node.next_node().label] += 1
+    for i, cnt in enumerate(counts):
+        assert abs(cnt / 20000 - (i + 1) / 10) < 0.02
+
+def test_add_transition_thaws():
+    node = pmark.MarkovNode()
+    node.add_transition(pmark.MarkovNode(), 1)
+    node.freeze()
+    node.add_transition(pmark.MarkovNode(), 1)
+    assert not node.is_frozen()
+    assert node.wsum == 2.0
+
+def test_frozen_uses_one_draw_per_step():
+    proc = make_chain()
+    rng = proc.current_node.rand
+    proc.freeze()
+    state = rng.getstate()
+    for _ in range(50):
+        proc.step()
+    after_frozen = rng.random()
+    rng.setstate(state)
+    for _ in range(50):
+        rng.random()
+    # The frozen run left the "markov" stream where an unfrozen run would
+    assert rng.random() == after_frozen
+
+def test_compiled_matches_nodes():
+    proc = make_chain()
+    rng = proc.current_node.rand
+    graph = proc.compile()
+    assert graph.state_count() == 3
+    state = rng.getstate()
+    labels = [proc.step().label for _ in range(200)]
+    rng.setstate(state)
+    walked = graph.walk(200)
+    assert [graph.label(s).label for s in walked] == labels
+
+def test_compiled_from_transitions():
+    graph = pmark.CompiledMarkov.from_transitions(
+        ['x', 'y', 'z'],
+        [('x', 'y', 1), ('y', 'z', 1), ('z', 'x', 1)])
+    assert list(graph.walk(6)) == [1, 2, 0, 1, 2, 0]
+    dead = pmark.CompiledMarkov.from_transitions(['x', 'y'], [('x', 'y', 1)])
+    with pytest.raises(ValueError):
+        dead.walk(2)
+
+def test_markov_sequence_compiled_replays_nodes():
+    nmap = {"one": 'A2', "two": 'C3', "three": 'E3'}
+    transition = [("one", "two", 1), ("two", "three", 8), ("two", "one", 2),
+                  ("three", "one", 8), ("three", "two", 1)]
+    compiled = pgen.MarkovSequence(nmap, transition)
+    plain = pgen.MarkovSequence(nmap, transition, compiled=False)
+    rng = plain.start_node.rand
+    state = rng.getstate()
+    a = [next(compiled).pitch_value() for _ in range(64)]
+    rng.setstate(state)
+    b = [next(plain).pitch_value() for _ in range(64)]
+    assert a == b
+
+def test_context_markov_order2():
+    labels = ['a', 'b', 'c']
+    transitions = [
+        (['a', 'b'], 'c', 1),
+        (['b', 'c'], 'a', 1),
+        (['c', 'a'], 'b', 1),
+        ('a', 'a', 1),
+        ('b', 'b', 1),
+    ]
+    graph = pmark.ContextMarkov(labels, transitions)
+    assert graph.order == 2
+    assert graph.context_count() == 5
+    assert [labels[s] for s in graph.walk(6)] == ['c', 'a', 'b', 'c', 'a', 'b']
+    # ('a', 'a') has no order-2 row, so it backs off to 'a' -> 'a'
+    graph.reset([0, 0])
+    assert graph.step() == 0
+    # 'c' has no transitions of its own; the order-0 row draws 'a' or 'b'
+    # by incoming first-order weight
+    graph.reset([2, 2])
+    assert graph.step() in (0, 1)
+    with pytest.raises(ValueError):
+        pmark.ContextMarkov(labels, []).step()
+
+def test_context_markov_step_matches_walk():
+    labels = ['a', 'b', 'c']
+    transitions = [(['a', 'b'], 'c', 2), (['a', 'b'], 'a', 1),
+                   ('a', 'b', 1), ('b', 'a', 1), ('b', 'c', 1), ('c', 'a', 1)]
+    graph = pmark.ContextMarkov(labels, transitions, order=3)
+    state = graph.rand.getstate()
+    walked = list(graph.walk(100))
+    graph.reset([0, 1])
+    graph.rand.setstate(state)
+    assert [graph.step() for _ in range(100)] == walked
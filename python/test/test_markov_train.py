@@ -0,0 +1,68 @@
+import pytest
+import sys, os
+
+sys.path.append(os.getcwd())
+
+import mido
+
+from phinrip.markov_train import MarkovTrainer
+from phinrip.note_generator import MarkovSequence
+from phinrip.note import NoteName
+
+
+def write_midi(path, notes, channel=0):
+    mid = mido.MidiFile()
+    track = mido.MidiTrack()
+    for n in notes:
+        track.append(mido.Message('note_on', note=n, velocity=90, channel=channel, time=0))
+        track.append(mido.Message('note_off', note=n, channel=channel, time=120))
+    mid.tracks.append(track)
+    mid.save(str(path))
+
+def test_note_name_round_trip():
+    for value in range(128):
+        assert NoteName.to_midi(NoteName.from_midi(value)) == value
+
+def test_train_directory(tmp_path):
+    write_midi(tmp_path / "a.mid", [60, 62, 64, 60, 62, 64])
+    write_midi(tmp_path / "b.mid", [60, 62, 67])
+    write_midi(tmp_path / "drums.mid", [36, 38, 36], channel=9)
+    trainer = MarkovTrainer(order=2)
+    trainer.add_directory(tmp_path, processes=2)
+    assert trainer.file_count == 3
+    assert trainer.counts[((60,), 62)] == 3
+    assert trainer.counts[((60, 62), 64)] == 2
+    assert trainer.counts[((60, 62), 67)] == 1
+    assert not any(36 in ctx for ctx, _ in trainer.counts)
+
+    single = MarkovTrainer(order=2)
+    single.add_directory(tmp_path, processes=1)
+    assert single.counts == trainer.counts
+
+    spec = trainer.to_spec(notecount=16)
+    seq = MarkovSequence(**spec)
+    notes = [next(seq) for _ in range(16)]
+    assert all(n.pitch_value() in (60, 62, 64, 67) for n in notes)
+
+def test_no_wrap_and_dead_ends(tmp_path):
+    write_midi(tmp_path / "a.mid", [60, 62, 64, 65])
+    trainer = MarkovTrainer()
+    trainer.add_directory(tmp_path, processes=1)
+    # 65 only ends the line; nothing invented leads back to 60
+    assert ((65,), 60) not in trainer.counts
+    assert sum(trainer.counts.values()) == 3
+    seq = MarkovSequence(**trainer.to_spec())
+    notes = [next(seq).pitch_value() for _ in range(200)]
+    assert set(notes) == {62, 64, 65}
+
+    wrapped = MarkovTrainer(wrap=True)
+    wrapped.add_notes([60, 62, 64, 65])
+    assert wrapped.counts[((65,), 60)] == 1
+
+def test_skipped_files_are_reported(tmp_path):
+    write_midi(tmp_path / "good.mid", [60, 62, 64])
+    (tmp_path / "bad.mid").write_bytes(b"not a MIDI file")
+    trainer = MarkovTrainer()
+    trainer.add_directory(tmp_path, processes=2)
+    assert trainer.file_count == 1
+    assert [p.name for p, _ in trainer.skipped] == ["bad.mid"]
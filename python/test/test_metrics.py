@@ -0,0 +1,41 @@
+import pytest
+import sys, os
+import io
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.metrics import LatencyHistogram, Instrumentation
+from stub_agents import StubAgent
+
+
+def test_histogram_percentiles():
+    hist = LatencyHistogram()
+    for value in range(1, 100001):
+        hist.record(value * 1000)
+    assert hist.count == 100000
+    assert hist.min == 1000 and hist.max == 100000000
+    for pct in (50, 90, 99, 99.9):
+        expected = pct / 100 * 100000000
+        assert abs(hist.percentile(pct) - expected) / expected < 0.04
+    hist.reset()
+    assert hist.percentile(50) is None
+
+def test_histogram_small_and_huge_values():
+    hist = LatencyHistogram()
+    for value in (0, 1, 63, 64, 1 << 50):
+        hist.record(value)
+    assert hist.percentile(1) == 0
+    assert hist.percentile(100) == 1 << 50
+
+def test_instrumented_controller():
+    metrics = Instrumentation()
+    cc = ClipController(RandomClipGenerator(), StubAgent, metrics=metrics)
+    cc.runFor(10)
+    snap = metrics.snapshot()
+    assert snap['tick']['count'] == cc._queue.current_time()
+    assert snap['fire.LaunchClipEvent']['count'] == 10
+    assert snap['fire.UpdateEvent']['count'] == 11
+    out = io.StringIO()
+    metrics.dump(out)
+    assert 'fire.LaunchClipEvent' in out.getvalue()
@@ -0,0 +1,90 @@
+import pytest
+import sys, os
+import io
+import random
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_controller import ClipController, Clip, RandomClipGenerator
+from phinrip.metrics import Instrumentation
+from phinrip.midi_queue import MidiAgent, ExternalSyncQueue, LIVE_LOG_SIZE
+from stub_agents import StubAgent, BurstAgent
+
+
+def test_sync_queue_transport_and_tempo():
+    sq = ExternalSyncQueue(StubAgent(), wait_for_start=True)
+    clock = mido.Message('clock')
+    sq.handle_message(clock, 0)
+    sq.handle_message(mido.Message('note_on', note=60))
+    assert sq.current_time() == 0
+    sq.handle_message(mido.Message('start'))
+    # 120 bpm at 24 ppqn: one clock every 20.833 ms, with 1 ms of jitter
+    rng = random.Random(3)
+    period = 60e9 / (120 * 24)
+    for i in range(480):
+        sq.handle_message(clock, int(i * period + rng.uniform(-1e6, 1e6)))
+    assert sq.current_time() == 480
+    assert abs(sq.bpm() - 120) < 0.5
+    assert abs(sq.predicted_next_tick() - 480 * period) < 1.5e6
+    sq.handle_message(mido.Message('stop'))
+    sq.handle_message(mido.Message('songpos', pos=8))
+    sq.handle_message(clock)
+    assert sq.current_time() == 480
+    assert sq.song_position == 48
+    sq.handle_message(mido.Message('continue'))
+    sq.handle_message(clock)
+    assert sq.current_time() == 481
+
+def test_midi_agent_send_raw():
+    class Port:
+        def __init__(self):
+            self.sent = []
+
+        def send(self, msg):
+            self.sent.append(msg)
+
+    agent = MidiAgent()
+    agent.out_port = Port()
+    agent._raw_writer = agent._find_raw_writer(agent.out_port)
+    agent.send_raw(Clip(2, 3).midi_bytes())
+    agent.send(Clip(2, 3).constructMidiMessage())
+    assert agent.out_port.sent[0] == agent.out_port.sent[1]
+
+def test_catch_up_coalesces_backlog():
+    agent = BurstAgent(400)
+    cc = ClipController(RandomClipGenerator(), agent=agent,
+                        catch_up=True, stale_policy='drop')
+    cc.runFor(3)
+    # Stops on the update at tick 289, a directly received clock
+    assert cc._queue.current_time() == 289
+    assert cc.late_clocks() == 72 * 3
+    assert cc.update_count == 4
+    # Launches 10 ticks after each update land inside a backlog
+    stale, dropped = cc._queue.stale_events()
+    assert stale == dropped == 3
+    assert cc._queue.bpm() == pytest.approx(120, rel=0.01)
+
+def test_catch_up_while_stopped_and_metrics():
+    metrics = Instrumentation()
+    agent = BurstAgent(40)
+    sq = ExternalSyncQueue(agent, wait_for_start=True, metrics=metrics, catch_up=True)
+    sq.run()
+    assert sq.current_time() == 0
+    assert sq.deadline_misses == 0
+    assert metrics.counters() == {}
+
+    sq = ExternalSyncQueue(BurstAgent(40), metrics=metrics, catch_up=True)
+    sq.run()
+    assert sq.current_time() == 40
+    assert sq.deadline_misses == 30
+    assert metrics.counters() == {'catch_up': 10, 'catch_up.clocks': 30}
+    assert 'catch_up' not in metrics.snapshot()
+    out = io.StringIO()
+    metrics.dump(out)
+    assert 'catch_up.clocks' in out.getvalue()
+
+def test_live_queue_log_is_bounded():
+    cc = ClipController(RandomClipGenerator(), StubAgent)
+    assert cc.event_log().maxlen == LIVE_LOG_SIZE
+    assert ExternalSyncQueue(StubAgent(), log_size=None).event_log().maxlen is None
@@ -0,0 +1,88 @@
+import pytest
+import sys, os, threading, time
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.midi_sender import MidiSender, ThreadedMidiAgent, encode_running_status
+
+
+def test_running_status_encoding():
+    batch = [bytes((0x90, 60, 64)), bytes((0x90, 62, 64)), bytes((0xF8,)),
+             bytes((0x90, 64, 64)), bytes((0x80, 60, 0)), bytes((0xF2, 0, 0)),
+             bytes((0x80, 62, 0))]
+    assert encode_running_status(batch) == bytes(
+        (0x90, 60, 64, 62, 64, 0xF8, 64, 64, 0x80, 60, 0, 0xF2, 0, 0, 0x80, 62, 0))
+
+def test_sender_coalesces_and_drops():
+    gate = threading.Event()
+    streams = []
+
+    def writer(stream):
+        gate.wait()
+        streams.append(stream)
+
+    sender = MidiSender(stream_writer=writer, maxsize=8, running_status=True)
+    sender.put(bytes((0x90, 1, 64)))
+    time.sleep(0.05)
+    # The thread is blocked writing the first batch; these queue up
+    sender.put_many([bytes((0x90, n, 64)) for n in range(2, 12)])
+    assert sender.dropped == 2
+    assert sender.depth() == 8
+    gate.set()
+    sender.close()
+    assert sender.sent == 9
+    assert sender.batches == 2
+    assert streams[1] == bytes([0x90] + [b for n in range(2, 10) for b in (n, 64)])
+
+def test_sender_rate_limit():
+    sent = []
+    sender = MidiSender(writer=sent.append, rate_limit=3125)
+    start = time.monotonic()
+    sender.put_many([bytes((0x90, 60, 64))] * 100)
+    sender.close()
+    # 300 bytes at 3125 bytes/s take ~0.1 s on the wire
+    assert time.monotonic() - start >= 0.09
+    assert len(sent) == 100
+    assert sender.late > 0
+
+def test_sender_writer_failure():
+    written = []
+
+    def writer(data):
+        if len(written) == 3:
+            raise OSError("port unplugged")
+        written.append(data)
+
+    sender = MidiSender(writer=writer)
+    sender.put_many([bytes((0x90, n, 64)) for n in range(5)])
+    sender._thread.join(1)
+    assert not sender._thread.is_alive()
+    with pytest.raises(OSError):
+        sender.put(bytes((0x90, 60, 64)))
+    with pytest.raises(OSError):
+        sender.close()
+    assert len(written) == 3
+    assert sender.sent == 0 and sender.dropped == 0
+
+def test_threaded_agent(monkeypatch):
+    class FakeRt:
+        def __init__(self):
+            self.sent = []
+        def send_message(self, data):
+            self.sent.append(bytes(data))
+
+    class FakePort:
+        def __init__(self):
+            self._rt = FakeRt()
+
+    port = FakePort()
+    monkeypatch.setattr(mido, 'open_output', lambda name: port)
+    agent = ThreadedMidiAgent('out', maxsize=64)
+    agent.open_ports()
+    agent.send(mido.Message('note_on', note=60, velocity=64))
+    agent.send_raw(bytes((0x90, 61, 64)))
+    agent.send_raw_many([bytes((0x90, 62, 64)), bytes((0x90, 63, 64))])
+    agent.close()
+    assert port._rt.sent == [bytes((0x90, n, 64)) for n in range(60, 64)]
+    assert agent.sender.stats()["sent"] == 4
@@ -0,0 +1,33 @@
+import pytest
+import sys, os, pickle
+
+sys.path.append(os.getcwd())
+
+from phinrip.note import Note, NoteName
+from phinrip.note_modulator import Transpose
+
+
+def test_name_table_round_trip():
+    for value in range(128):
+        assert NoteName.to_midi(NoteName.from_midi(value)) == value
+    assert NoteName.to_midi('Eb3') == NoteName.to_midi('D#3') == 51
+    with pytest.raises(ValueError):
+        NoteName.to_midi('H3')
+
+def test_notes_are_interned():
+    a = Note('C3')
+    assert a is Note('C3', 96) is Note.from_value(48)
+    assert a is not Note('C3', 100)
+    assert a is not Note('C3', channel=1)
+    assert pickle.loads(pickle.dumps(a)) is a
+    with pytest.raises(AttributeError):
+        a._velocity = 10
+
+def test_transpose_lookup():
+    a = Note('A2', 80)
+    up = a.transpose(12)
+    assert up is Note('A3', 80)
+    assert up is a.transpose(12)
+    assert Transpose(-12)._do_modulate(up) is a
+    assert a.transpose(-100).pitch_name() == ''
+    assert repr(up) == "Note('A3', 80)"
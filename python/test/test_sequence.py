@@ -1,11 +1,16 @@
 import pytest
 import sys, os
+import io
+import random
+from array import array
 
 
 SCALE = ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5']
 
 import phinrip.step_sequence as sseq
 import phinrip.note as note
+import phinrip.note_generator as gen
+import phinrip.note_modulator as mod
 
 def test_sequence_scale():
     file = sseq.StepSequenceFile()
@@ -14,3 +19,134 @@ def test_sequence_scale():
         step = sseq.StepEvent.note(noteval)
         file.add_step(step)
 
+
+def test_step_buffer_extend_matches_add_step():
+    notes = [60, 62, 0, 65, 67]
+    rests = [0, 0, 1, 0, 0]
+    one = sseq.StepSequenceFile()
+    for n, r in zip(notes, rests):
+        if r:
+            one.add_rest()
+        else:
+            one.add_note_value(n, velocity=90, channel=2)
+    bulk = sseq.StepSequenceFile()
+    bulk.extend_steps(array('B', notes), velocities=[90] * 5, channels=[2] * 5, rests=rests)
+    assert list(bulk._steps) == list(one._steps)
+    assert bulk._steps[2].is_rest()
+    assert bulk._steps[3] == sseq.StepEvent.note(65, velocity=90, channel=2)
+    assert bulk.to_midifile().tracks[0] == one.to_midifile().tracks[0]
+    assert bulk._steps.nbytes() == 4 * 5
+
+def test_step_buffer_range_checks():
+    buf = sseq.StepBuffer()
+    with pytest.raises(ValueError):
+        buf.append_note(128)
+    with pytest.raises(ValueError):
+        buf.extend([60, -1])
+    with pytest.raises(ValueError):
+        buf.extend([60, 61], velocities=[96])
+    assert len(buf) == 0
+
+def _mido_bytes(file):
+    buf = io.BytesIO()
+    file.to_midifile().save(file=buf)
+    return buf.getvalue()
+
+@pytest.mark.parametrize("signature,length", [((4, 4), sseq.StepLength.EIGHTH),
+                                              ((6, 8), sseq.StepLength.WHOLE)])
+def test_direct_encoder_matches_mido(tmp_path, signature, length):
+    rng = random.Random(7)
+    file = sseq.StepSequenceFile(bpm=97, time_signature=signature, step_length=length,
+                                 track_name="Encoder Ä")
+    file.add_rest()
+    for _ in range(3000):
+        if rng.random() < 0.2:
+            # Long runs of rests need multi-byte delta times
+            for _ in range(rng.randint(1, 40)):
+                file.add_rest()
+        else:
+            file.add_note_value(rng.randint(0, 127), rng.randint(0, 127), rng.randint(0, 15))
+    file.add_rest()
+    assert file.to_bytes() == _mido_bytes(file)
+    saved = file.save(tmp_path / "seq.mid")
+    assert saved.read_bytes() == _mido_bytes(file)
+
+def test_direct_encoder_running_status():
+    enc = sseq._SmfTrackEncoder()
+    enc.channel(0, bytes((0x90, 60, 64)))
+    enc.channel(200, bytes((0x90, 62, 64)))
+    enc.meta(0, b'\xff\x01\x00')
+    enc.channel(0, bytes((0x90, 64, 64)))
+    assert enc.take() == bytes((0, 0x90, 60, 64, 0x81, 0x48, 62, 64,
+                                0, 0xff, 0x01, 0x00, 0, 0x90, 64, 64))
+    assert sseq._vlq(0x0FFFFFFF) == b'\xff\xff\xff\x7f'
+
+def test_empty_sequence_bytes():
+    file = sseq.StepSequenceFile()
+    assert file.to_bytes() == _mido_bytes(file)
+
+def test_stream_matches_in_memory(tmp_path):
+    rng = random.Random(3)
+    steps = [None if rng.random() < 0.3 else rng.randint(30, 90) for _ in range(1000)]
+    steps += [None] * 5
+    whole = sseq.StepSequenceFile()
+    with sseq.StepSequenceStream(tmp_path / "stream.mid", chunk_steps=64) as stream:
+        for value in steps:
+            for file in (whole, stream):
+                if value is None:
+                    file.add_rest()
+                else:
+                    file.add_note_value(value)
+        assert len(stream._steps) < 64
+    assert not hasattr(stream, "to_bytes") and not hasattr(stream, "to_midifile")
+    assert stream.step_count == len(steps)
+    assert stream.path.read_bytes() == whole.to_bytes()
+
+def test_generator_streams_steps(tmp_path):
+    notes = ['A2', 'C3', 'E3', 'A3']
+    in_memory = sseq.GenerateStepSequencer(gen.Arpeggiator(notes), []).generate_steps(500)
+    arp = gen.Arpeggiator(notes, history_size=16)
+    path = sseq.GenerateStepSequencer(arp, []).stream_steps(tmp_path / "arp.mid", 500,
+                                                            chunk_steps=100)
+    assert path.read_bytes() == in_memory.to_bytes()
+    assert len(arp._history) == 16
+
+def _markov_seq(seed, **args):
+    nmap = {"one": 'A2', "two": 'C3', "three": 'E3', "four": 'G3'}
+    transition = [("one", "two", 1), ("two", "three", 8), ("two", "one", 2),
+                  ("three", "one", 8), ("three", "two", 1), ("three", "four", 1),
+                  ("four", "one", 1)]
+    seq = gen.MarkovSequence(nmap, transition, **args)
+    seq.graph.rand = random.Random(seed)
+    return seq
+
+def test_take_block_matches_next():
+    for make in (lambda: gen.Arpeggiator(['A2', 'C3', 'E3'], notecount=50),
+                 lambda: _markov_seq(9, notecount=50)):
+        one, block = make(), make()
+        expected = [next(one) for _ in range(50)]
+        pitches, velocities, channels = block.take_block(20)
+        more = block.take_block(100)
+        assert len(more[0]) == 30
+        assert list(pitches) + list(more[0]) == [n.pitch_value() for n in expected]
+        assert list(velocities) == [96] * 20 and list(channels) == [0] * 20
+        assert list(block._history) == list(one._history)
+        assert len(block.take_block(5)[0]) == 0
+
+def test_take_block_fallback():
+    class Fixed(gen.NoteGenerator):
+        def _generate_note(self):
+            return note.Note('D4', 70)
+
+    pitches, velocities, _ = Fixed(notecount=3).take_block(10)
+    assert list(pitches) == [62] * 3 and list(velocities) == [70] * 3
+
+def test_block_sequencer_matches_per_note():
+    def build(mods):
+        gens = [gen.Arpeggiator(['C3', 'A3', 'F3'], notecount=32), _markov_seq(4, notecount=5000)]
+        return sseq.GenerateStepSequencer(gens, mods).generate_steps(6000)
+
+    blocks = build([])
+    per_note = build([mod.NoteModulator()])
+    assert len(blocks._steps) == 5032
+    assert blocks.to_bytes() == per_note.to_bytes()
@@ -0,0 +1,25 @@
+import pytest
+import sys, os
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_controller import ClipController, RandomClipGenerator
+from phinrip.sim_agent import SimulatedClockAgent
+
+
+def test_simulated_clock_agent():
+    agent = SimulatedClockAgent(bpm=140, jitter_ns=500000, max_speed=True, seed=5)
+    cc = ClipController(RandomClipGenerator(), agent=agent)
+    cc.runFor(20)
+    assert len(agent.sent) == 20
+    assert abs(cc._queue.bpm() - 140) < 1
+    stamps = [t for t, _ in agent.sent]
+    assert stamps == sorted(stamps)
+
+    # A finite clock ends the run on its own
+    agent = SimulatedClockAgent(max_speed=True, max_ticks=200)
+    cc = ClipController(RandomClipGenerator(), agent=agent)
+    cc.runFor(100)
+    assert cc._queue.current_time() == 200
+    # Launches at 11 and 107; the one due at 203 never fires
+    assert len(agent.sent) == 2
@@ -0,0 +1,31 @@
+import pytest
+import sys, os
+
+sys.path.append(os.getcwd())
+
+from phinrip.tempo import TempoTracker
+
+PERIOD = 60e9 / (120 * 24)
+
+
+@pytest.mark.parametrize("first_interval", [100000, 0.2 * PERIOD, 3 * PERIOD])
+def test_bad_first_interval_recovers(first_interval):
+    tracker = TempoTracker()
+    tracker.clock(0)
+    start = int(first_interval)
+    for i in range(200):
+        tracker.clock(int(start + (i + 1) * PERIOD))
+    assert tracker.bpm() == pytest.approx(120, rel=0.001)
+
+def test_pause_keeps_period():
+    tracker = TempoTracker()
+    for i in range(100):
+        tracker.clock(int(i * PERIOD))
+    # Transport paused for ten seconds, then steady again
+    resume = int(99 * PERIOD + 10e9)
+    tracker.clock(resume)
+    assert tracker.bpm() == pytest.approx(120, rel=0.001)
+    for i in range(1, 10):
+        tracker.clock(int(resume + i * PERIOD))
+    assert tracker.bpm() == pytest.approx(120, rel=0.001)
+    assert tracker.predict() == pytest.approx(resume + 10 * PERIOD, abs=1e5)
@@ -0,0 +1,34 @@
+import pytest
+import sys, os
+import random
+import mido
+
+sys.path.append(os.getcwd())
+
+from phinrip.clip_controller import (ClipController, Clip, RandomClipGenerator,
+                                     TimelineClipGenerator)
+from phinrip.sim_agent import SimulatedClockAgent
+from phinrip.timeline import LaunchTimeline
+from stub_agents import StubAgent
+
+
+def test_render_offline_and_replay(tmp_path):
+    random.seed(11)
+    cc = ClipController(RandomClipGenerator(), StubAgent)
+    timeline = cc.renderOffline(500)
+    assert len(timeline) == 500
+    assert list(timeline.ticks) == [11 + 96 * i for i in range(500)]
+    assert cc._agent.msg_log == []
+    with pytest.raises(RuntimeError):
+        cc.renderOffline(10)
+
+    loaded = LaunchTimeline.load(timeline.save(tmp_path / "plan.bin"))
+    assert list(loaded) == list(timeline)
+    mid = mido.MidiFile(timeline.save_midi(tmp_path / "plan.mid"))
+    notes = [m for m in mid.tracks[0] if m.type == 'note_on']
+    assert [m.note for m in notes] == [Clip(t, s)._convertToNoteVal() for _, t, s in timeline]
+
+    agent = SimulatedClockAgent(max_speed=True)
+    replay = ClipController(TimelineClipGenerator(loaded), agent=agent)
+    replay.runFor(20)
+    assert [data for _, data in agent.sent] == [Clip(t, s).midi_bytes() for _, t, s in list(timeline)[:20]]